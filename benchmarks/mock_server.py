@@ -0,0 +1,229 @@
+import time
+import html
+import threading
+from dataclasses import dataclass
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+CHUNK_SIZE = 65536
+ALBUM_PATH = '/game-soundtracks/album/'
+
+@dataclass
+class MockAlbum:
+    name: str
+    tracks_per_cd: int
+    cds: int = 1
+    booklet_images: int = 2
+    file_size: int = 1024 * 1024
+    image_size: int = 256 * 1024
+    
+    @property
+    def has_cd_column(self) -> bool:
+        return self.cds > 1
+
+class MockRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections alive between requests, like the real CDNs
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_HEAD(self):
+        self._handle(send_body=False)
+    
+    def do_GET(self):
+        self._handle(send_body=True)
+    
+    def _handle(self, send_body: bool):
+        parsed = urlparse(self.path)
+        if parsed.path.startswith(ALBUM_PATH):
+            self._handle_page(parsed.path[len(ALBUM_PATH):], send_body)
+            return
+        if not parsed.path.startswith('/files/'):
+            self.send_error(404)
+            return
+        
+        query = parse_qs(parsed.query)
+        size = int(query.get('size', [self._default_size(parsed.path)])[0])
+        
+        # ?fail=N answers the first N requests for a path with ?status= (503 by default)
+        fail_count = int(query.get('fail', [0])[0])
+        with self.server.lock:
+            attempts = self.server.attempts.get(self.path, 0) + 1
+            self.server.attempts[self.path] = attempts
+        if attempts <= fail_count:
+            self.send_response(int(query.get('status', [503])[0]))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        if range_header and range_header.startswith('bytes='):
+            first, _, last = range_header[6:].partition('-')
+            start = int(first or 0)
+            end = min(int(last), size - 1) if last else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.end_headers()
+        if send_body:
+            self._write_body(start, end + 1)
+    
+    def _default_size(self, path: str) -> int:
+        # Files of a mock album: /files/<slug>/...
+        album = self.server.albums.get(path.split('/')[2])
+        if album is None:
+            return self.server.file_size
+        if path.endswith('.jpg'):
+            return album.image_size
+        return album.file_size * 3 if path.endswith('.flac') else album.file_size
+    
+    def _handle_page(self, path: str, send_body: bool):
+        slug, _, song = path.partition('/')
+        album = self.server.albums.get(slug)
+        if album is None:
+            self.send_error(404)
+            return
+        if song:
+            try:
+                cd_number, track_number = (int(part) for part in song.rsplit('.', 1)[0].split('-'))
+            except ValueError:
+                self.send_error(404)
+                return
+            page = render_song_page(album, slug, cd_number, track_number)
+        else:
+            page = render_album_page(album, slug)
+        
+        if self.server.page_latency:
+            time.sleep(self.server.page_latency)
+        body = page.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+    
+    def _write_body(self, start: int, stop: int):
+        # Byte n of every file is n % 256, so ranges can be served from one block
+        block = self.server.block
+        position = start
+        while position < stop:
+            offset = position % len(block)
+            count = min(stop - position, len(block) - offset)
+            self.wfile.write(block[offset:offset + count])
+            position += count
+
+def render_album_page(album: MockAlbum, slug: str) -> str:
+    """Album page with the markup of a KHInsider songlist, booklet thumbnails included"""
+    cd_header = '<th><b>CD</b></th>' if album.has_cd_column else ''
+    rows = []
+    for cd_number in range(1, album.cds + 1):
+        for track_number in range(1, album.tracks_per_cd + 1):
+            song_url = f"{ALBUM_PATH}{slug}/{cd_number}-{track_number}.mp3"
+            cd_cell = f'<td align="center">{cd_number}</td>' if album.has_cd_column else ''
+            rows.append(
+                f'<tr><td class="playTrack"><div class="playTrack"></div></td>{cd_cell}'
+                f'<td class="clickable-row" align="right">{track_number}.</td>'
+                f'<td class="clickable-row"><a href="{song_url}">Track {cd_number}-{track_number}</a></td>'
+                f'<td class="clickable-row" align="right"><a href="{song_url}">3:{track_number % 60:02d}</a></td>'
+                f'<td class="clickable-row" align="right"><a href="{song_url}">{album.file_size / 1048576:.2f} MB</a></td>'
+                f'<td class="clickable-row" align="right"><a href="{song_url}">{album.file_size * 3 / 1048576:.2f} MB</a></td>'
+                f'<td class="playlistDownloadSong"><a href="{song_url}"><i class="material-icons">get_app</i></a></td>'
+                f'<td class="playlistAddCell"><div class="playlistAddTo"></div></td></tr>'
+            )
+    images = ''.join(
+        f'<div class="albumImage"><a href="/files/{slug}/Scans/page{index:02d}.jpg" target="_blank">'
+        f'<img src="/files/{slug}/Scans/thumbs/page{index:02d}.jpg" alt=""></a></div>'
+        for index in range(1, album.booklet_images + 1)
+    )
+    return (
+        f'<html><head><title>{html.escape(album.name)}</title></head><body><div id="pageContent">'
+        f'<h2>{html.escape(album.name)}</h2>'
+        f'<table><tr><td>{images}</td></tr></table>'
+        f'<table id="songlist"><tr id="songlist_header"><th>&nbsp;</th>{cd_header}<th><b>#</b></th>'
+        f'<th colspan="2"><b>Song Name</b></th><th><b>MP3</b></th><th><b>FLAC</b></th><th>&nbsp;</th><th>&nbsp;</th></tr>'
+        f'{"".join(rows)}'
+        f'<tr id="songlist_footer"><th colspan="4">Total:</th></tr></table>'
+        f'</div></body></html>'
+    )
+
+def render_song_page(album: MockAlbum, slug: str, cd_number: int, track_number: int) -> str:
+    """Song page with one songDownloadLink per format, like the real site"""
+    links = ''.join(
+        f'<p><a href="/files/{slug}/{cd_number}-{track_number:02d}.{ext}">'
+        f'<span class="songDownloadLink"><i class="material-icons">get_app</i>Click here to download as {ext.upper()}</span></a></p>'
+        for ext in ('mp3', 'flac')
+    )
+    return (
+        f'<html><body><div id="pageContent">'
+        f'<p align="left">Album name: <b>{html.escape(album.name)}</b><br>'
+        f'Song name: <b>Track {cd_number}-{track_number}</b></p>{links}'
+        f'</div></body></html>'
+    )
+
+class MockServer:
+    """Local stand-in for KHInsider and its download CDNs, for offline measurements.
+    
+    ``GET /files/<name>?size=<bytes>`` returns a synthetic blob of ``size`` bytes
+    (``file_size`` by default) after ``latency`` seconds. Albums registered with
+    ``add_album`` are served as album and song pages after ``page_latency``
+    seconds, linking to such blobs; FLAC files are three times the MP3 size.
+    """
+    
+    def __init__(self, file_size: int = 1024 * 1024, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0,
+                 page_latency: float = 0.0):
+        self.httpd = ThreadingHTTPServer((host, port), MockRequestHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.file_size = file_size
+        self.httpd.latency = latency
+        self.httpd.page_latency = page_latency
+        self.httpd.albums = {}
+        self.httpd.block = bytes(range(256)) * (CHUNK_SIZE // 256)
+        self.httpd.attempts = {}
+        self.httpd.lock = threading.Lock()
+        self.thread = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def file_url(self, name: str, size: int = None) -> str:
+        url = f"{self.base_url}/files/{name}"
+        return f"{url}?size={size}" if size is not None else url
+    
+    def add_album(self, slug: str, album: MockAlbum) -> str:
+        """Serve an album and return its page URL"""
+        self.httpd.albums[slug] = album
+        return f"{self.base_url}{ALBUM_PATH}{slug}"
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
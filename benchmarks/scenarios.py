@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Run whole-album download scenarios against the local mock KHInsider server.
+
+Every combination of scenario, scraper backend, download engine and worker
+count downloads its albums from scratch into a temporary directory; scrape
+time, files/s and MB/s are reported for each.
+
+Usage: python -m benchmarks.scenarios --workers 1,4,8 --pages 1,4 --page-latency 0.05
+"""
+
+import io
+import time
+import argparse
+import itertools
+import tempfile
+from contextlib import redirect_stdout
+from typing import Dict, List
+from src.config import Config
+from src.downloader import VideoGameMusicDownloader
+from src.metrics import registry
+from .mock_server import MockServer, MockAlbum
+
+MB = 1024 * 1024
+
+# Albums downloaded by each scenario, keyed by URL slug
+SCENARIOS: Dict[str, Dict[str, MockAlbum]] = {
+    'single-cd': {
+        'single-cd': MockAlbum('Single CD', tracks_per_cd=24, file_size=MB),
+    },
+    'multi-cd': {
+        'multi-cd': MockAlbum('Multi CD', tracks_per_cd=12, cds=3, file_size=MB),
+    },
+    'many-albums': {
+        f'album-{index}': MockAlbum(f'Album {index}', tracks_per_cd=8, booklet_images=4, file_size=MB // 2)
+        for index in range(1, 7)
+    },
+    'large-files': {
+        'large-files': MockAlbum('Large Files', tracks_per_cd=4, booklet_images=0, file_size=16 * MB),
+    },
+}
+
+def run_scenario(server: MockServer, albums: Dict[str, MockAlbum], config: Config) -> Dict[str, float]:
+    album_urls = [server.add_album(slug, album) for slug, album in albums.items()]
+    registry.reset()
+    downloader = VideoGameMusicDownloader(config)
+    
+    started = time.perf_counter()
+    # The downloader's own progress output would drown the report
+    with redirect_stdout(io.StringIO()):
+        results = downloader.download_albums(album_urls)
+    elapsed = time.perf_counter() - started
+    
+    errors = [result.error for result in results if result.error]
+    if errors:
+        raise RuntimeError(f"scenario failed: {errors[0]}")
+    return {
+        'elapsed': elapsed,
+        'scrape': sum(histogram.sum for histogram in registry.histograms('scrape_seconds')),
+        'files': sum(result.successful_files + result.successful_booklets for result in results),
+        'total': sum(result.total_files + result.total_booklets for result in results),
+        'bytes': registry.get('bytes_downloaded_total'),
+    }
+
+def parse_counts(value: str) -> List[int]:
+    return [int(part) for part in value.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end download scenarios against a mock KHInsider')
+    parser.add_argument('scenarios', nargs='*', help=f"Scenarios to run: {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('-s', '--scraper', choices=['http', 'selenium', 'both'], default='http', help='Scraper backend')
+    parser.add_argument('-e', '--engine', choices=['threads', 'async', 'both'], default='both', help='Download engine')
+    parser.add_argument('-w', '--workers', type=parse_counts, default=[4], help='Comma-separated download worker counts')
+    parser.add_argument('-p', '--pages', type=parse_counts, default=[1], help='Comma-separated song page worker counts')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency per file request in seconds')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='Server latency per page in seconds')
+    parser.add_argument('--format', choices=['mp3', 'flac', 'both'], default='both', help='Audio format to download')
+    parser.add_argument('--format-policy', choices=['all', 'prefer-flac', 'smallest', 'skip-owned'], default='all',
+                        help='Which of the allowed formats to fetch for each track')
+    args = parser.parse_args()
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(unknown)}")
+    
+    scenarios = args.scenarios or list(SCENARIOS)
+    scrapers = ['http', 'selenium'] if args.scraper == 'both' else [args.scraper]
+    engines = ['threads', 'async'] if args.engine == 'both' else [args.engine]
+    
+    with MockServer(latency=args.latency, page_latency=args.page_latency) as server:
+        for name, scraper, engine, workers, pages in itertools.product(
+                scenarios, scrapers, engines, args.workers, args.pages):
+            with tempfile.TemporaryDirectory() as output_dir:
+                config = Config(
+                    output_dir=output_dir,
+                    audio_format=args.format,
+                    format_policy=args.format_policy,
+                    headless=True,
+                    scraper_backend=scraper,
+                    page_workers=pages,
+                    download_workers=workers,
+                    async_transfers=workers,
+                    max_connections_per_host=workers,
+                    download_engine=engine,
+                    download_delay=0,
+                    page_delay=0,
+                    max_request_rate=1000,
+                    # Every run starts cold: nothing cached, journaled or indexed
+                    use_cache=False,
+                    use_journal=False,
+                    use_library=False,
+                    use_content_index=False,
+                    progress_bar=False
+                )
+                stats = run_scenario(server, SCENARIOS[name], config)
+            
+            elapsed = stats['elapsed']
+            print(f"{name:>12} {scraper:>8} {engine:>7} w={workers:<2} p={pages:<2}: "
+                  f"{stats['files']:.0f}/{stats['total']:.0f} files in {elapsed:.2f}s, scrape {stats['scrape']:.2f}s "
+                  f"({stats['files'] / elapsed:.1f} files/s, {stats['bytes'] / MB / elapsed:.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""Measure raw transfer throughput of the download engines against a local mock server.
+
+Usage: python -m benchmarks.throughput --files 32 --size 8 --latency 0.05
+"""
+
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from src.config import Config
+from src.models import TrackInfo
+from src.file_downloader import FileDownloader
+from .mock_server import MockServer
+
+def run_threads(config: Config, urls):
+    downloader = FileDownloader(config)
+    with ThreadPoolExecutor(max_workers=config.download_workers) as executor:
+        results = list(executor.map(
+            lambda item: downloader.download_track(item[1], "Benchmark", TrackInfo(1, item[0], "Track", ""), 1),
+            enumerate(urls, 1)
+        ))
+    return sum(results)
+
+def run_async(config: Config, urls):
+    from src.async_file_downloader import AsyncFileDownloader
+    
+    async def main():
+        async with AsyncFileDownloader(config) as downloader:
+            results = await asyncio.gather(*(
+                downloader.download_track(url, "Benchmark", TrackInfo(1, number, "Track", ""), 1)
+                for number, url in enumerate(urls, 1)
+            ))
+        return sum(results)
+    
+    return asyncio.run(main())
+
+def main():
+    parser = argparse.ArgumentParser(description='Download engine throughput benchmark')
+    parser.add_argument('--files', type=int, default=32, help='Number of files to download')
+    parser.add_argument('--size', type=float, default=8.0, help='File size in MB')
+    parser.add_argument('--latency', type=float, default=0.0, help='Server latency per request in seconds')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Parallel downloads')
+    parser.add_argument('--per-host', type=int, default=4, help='Maximum connections per host')
+    parser.add_argument('--segments', type=int, default=1, help='Byte-range segments per file (threads engine)')
+    parser.add_argument('-e', '--engine', choices=['threads', 'async', 'both'], default='both', help='Engine to measure')
+    args = parser.parse_args()
+    
+    size = int(args.size * 1024 * 1024)
+    engines = ['threads', 'async'] if args.engine == 'both' else [args.engine]
+    
+    with MockServer(file_size=size, latency=args.latency) as server:
+        urls = [server.file_url(f"track{number:03d}.mp3") for number in range(args.files)]
+        
+        for engine in engines:
+            with tempfile.TemporaryDirectory() as output_dir:
+                config = Config(
+                    output_dir=output_dir,
+                    download_delay=0,
+                    max_request_rate=1000,
+                    download_workers=args.workers,
+                    async_transfers=args.workers,
+                    max_connections_per_host=args.per_host,
+                    download_segments=args.segments,
+                    segment_threshold_mb=0,
+                    download_engine=engine
+                )
+                runner = run_async if engine == 'async' else run_threads
+                
+                start = time.perf_counter()
+                completed = runner(config, urls)
+                elapsed = time.perf_counter() - start
+                
+                megabytes = completed * size / (1024 * 1024)
+                print(f"{engine:>8}: {completed}/{len(urls)} files in {elapsed:.2f}s "
+                      f"({completed / elapsed:.1f} files/s, {megabytes / elapsed:.1f} MB/s)")
+
+if __name__ == "__main__":
+    main()
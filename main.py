@@ -5,35 +5,126 @@ import argparse
 from src.downloader import VideoGameMusicDownloader
 from src.config import Config
 
+def read_album_urls(path: str):
+    """Read album URLs from a file, or stdin for '-', one per line; '#' starts a comment"""
+    stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    with stream:
+        lines = [line.split('#', 1)[0].strip() for line in stream]
+    return [line for line in lines if line]
+
 def main():
     parser = argparse.ArgumentParser(description='Video Game Music Downloader')
-    parser.add_argument('url', help='Album URL to download')
+    parser.add_argument('urls', nargs='*', metavar='url', help='Album URL(s) to download')
+    parser.add_argument('-i', '--input-file', help="File with one album URL per line ('-' reads stdin)")
     parser.add_argument('-o', '--output', default='downloads', help='Output directory')
     parser.add_argument('-f', '--format', choices=['mp3', 'flac', 'both'], default='both', help='Audio format to download')
+    parser.add_argument('--format-policy', choices=['all', 'prefer-flac', 'smallest', 'skip-owned'], default='all',
+                        help='Which of the formats allowed by --format to fetch for each track')
     parser.add_argument('-b', '--browser', choices=['chrome', 'edge', 'firefox'], default='auto', help='Browser to use')
     parser.add_argument('--headless', action='store_true', help='Run browser in headless mode')
+    parser.add_argument('--full-browser', action='store_true', help='Load images, fonts and third-party content in the browser')
+    parser.add_argument('-s', '--scraper', choices=['selenium', 'http'], default='selenium', help='Scraper backend (http falls back to the browser on challenge pages)')
+    parser.add_argument('-p', '--pages', type=int, default=1, help='Song pages resolved in parallel (one browser each with the selenium backend)')
+    parser.add_argument('--recycle-after', type=int, default=200, help='Restart a browser after this many page loads (0 never restarts)')
     parser.add_argument('--no-booklet', action='store_true', help='Skip downloading booklet images')
+    parser.add_argument('--refresh', action='store_true', help='Ignore cached album and song page metadata and scrape again')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the metadata cache')
+    parser.add_argument('--no-journal', action='store_true', help='Do not record progress for resuming interrupted albums')
+    parser.add_argument('--no-library', action='store_true', help='Check every album again instead of skipping tracks and albums recorded as complete')
+    parser.add_argument('--sync', action='store_true', help='Re-read album songlists and download only tracks added or changed since the last run')
+    parser.add_argument('--no-dedup', action='store_true', help='Keep identical files as separate copies instead of hardlinks')
+    parser.add_argument('--tag', action='store_true', help='Write album, title, track and disc number tags into downloaded files (needs mutagen)')
+    parser.add_argument('--transcode-mp3', action='store_true', help='Derive an MP3 from tracks only offered as FLAC, with --format both (needs ffmpeg)')
+    parser.add_argument('--post-workers', type=int, default=0, help='Processes for tagging and transcoding (default: one per core)')
+    parser.add_argument('--verify', action='store_true', help='Re-check the hashes of all downloaded files instead of downloading')
+    parser.add_argument('--metrics-log', default='', help='Append a JSON line for every request, transfer, retry and sleep to this file')
+    parser.add_argument('--metrics-file', default='', help='Keep counters and histograms in Prometheus text format in this file')
+    parser.add_argument('--no-progress', action='store_true', help='Do not draw the progress bar')
+    parser.add_argument('-w', '--workers', type=int, default=4, help='Number of parallel download workers')
+    parser.add_argument('--per-host', type=int, default=2, help='Maximum simultaneous connections per host')
+    parser.add_argument('--segments', type=int, default=4, help='Parallel connections per large file (1 disables segmented downloads)')
+    parser.add_argument('--fixed-rate', action='store_true', help='Keep the initial request spacing instead of adapting it to server responses')
+    parser.add_argument('--max-rate', type=float, default=10.0, help='Maximum requests per second to one host')
+    parser.add_argument('--retries', type=int, default=4, help='Retries per page or file after transient errors')
+    parser.add_argument('-a', '--albums', type=int, default=1, help='Number of albums downloaded at the same time')
+    parser.add_argument('--album-priority', choices=['smallest', 'fifo'], default='smallest', help='Which of the albums downloading together gets free workers first')
+    parser.add_argument('--limit-rate', type=float, default=0.0, help='Cap the total download rate in MB/s (0 for no cap)')
+    parser.add_argument('-e', '--engine', choices=['threads', 'async'], default='threads', help='Download engine (async multiplexes transfers over HTTP/2)')
+    parser.add_argument('--serve', type=int, metavar='PORT', help='Run as a service that takes album URLs over a local HTTP/JSON API on this port')
+    parser.add_argument('--bind', default='127.0.0.1', help='Address the service listens on')
     
     args = parser.parse_args()
     
+    album_urls = list(args.urls)
+    if args.input_file:
+        album_urls.extend(read_album_urls(args.input_file))
+    if not album_urls and not args.verify and args.serve is None:
+        parser.error('no album URLs given')
+    if args.sync and args.no_library:
+        parser.error('--sync needs the library index')
+    
     config = Config(
         output_dir=args.output,
         audio_format=args.format,
+        format_policy=args.format_policy,
         browser=args.browser,
         headless=args.headless,
-        download_booklet=not args.no_booklet
+        lean_browser=not args.full_browser,
+        scraper_backend=args.scraper,
+        page_workers=args.pages,
+        browser_recycle_after=args.recycle_after,
+        download_booklet=not args.no_booklet,
+        use_journal=not args.no_journal,
+        hardlink_duplicates=not args.no_dedup,
+        use_library=not args.no_library,
+        tag_files=args.tag,
+        transcode_mp3=args.transcode_mp3,
+        post_workers=args.post_workers,
+        sync=args.sync,
+        use_cache=not args.no_cache,
+        refresh=args.refresh,
+        metrics_log=args.metrics_log,
+        metrics_file=args.metrics_file,
+        progress_bar=not args.no_progress,
+        download_workers=args.workers,
+        album_workers=args.albums,
+        album_priority=args.album_priority,
+        max_bandwidth_mb=args.limit_rate,
+        adaptive_rate=not args.fixed_rate,
+        max_request_rate=args.max_rate,
+        max_retries=args.retries,
+        max_connections_per_host=args.per_host,
+        download_segments=args.segments,
+        download_engine=args.engine
     )
     
+    if args.serve is not None:
+        # Imported lazily like the async engine, so one-shot runs don't load the server
+        from src.daemon import serve
+        try:
+            serve(config, args.bind, args.serve, album_urls)
+        except KeyboardInterrupt:
+            print("\nService stopped; unfinished jobs resume on the next start")
+            sys.exit(1)
+        return
+    
     downloader = VideoGameMusicDownloader(config)
     
+    if args.verify:
+        report = downloader.verify_library()
+        sys.exit(1 if report['missing'] or report['corrupted'] else 0)
+    
     try:
-        downloader.download_album(args.url)
+        results = downloader.download_albums(album_urls)
     except KeyboardInterrupt:
         print("\nDownload interrupted by user")
         sys.exit(1)
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
+    
+    if any(result.error for result in results):
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
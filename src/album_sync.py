@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple, Set, Optional
+from .models import AlbumInfo, TrackInfo
+
+# Songlist fields whose change means a track was corrected and must be fetched again
+TRACKED_FIELDS = ('cd_number', 'track_number', 'title', 'duration')
+
+@dataclass
+class AlbumDiff:
+    added: List[TrackInfo] = field(default_factory=list)
+    removed: List[TrackInfo] = field(default_factory=list)
+    changed: List[Tuple[TrackInfo, TrackInfo]] = field(default_factory=list)
+    # False when there was no earlier snapshot to compare with
+    has_baseline: bool = True
+    
+    @property
+    def changed_urls(self) -> Set[str]:
+        return {new.song_page_url for _, new in self.changed}
+    
+    @property
+    def added_urls(self) -> Set[str]:
+        return {track.song_page_url for track in self.added}
+    
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+    
+    def describe(self) -> List[str]:
+        lines = [f"+ {self._label(track)}" for track in self.added]
+        for old, new in self.changed:
+            changes = ', '.join(
+                f"{name} {getattr(old, name)!r} -> {getattr(new, name)!r}"
+                for name in TRACKED_FIELDS if getattr(old, name) != getattr(new, name)
+            )
+            lines.append(f"~ {self._label(new)} ({changes})")
+        lines.extend(f"- {self._label(track)}" for track in self.removed)
+        return lines
+    
+    def _label(self, track: TrackInfo) -> str:
+        return f"CD{track.cd_number}-{track.track_number:02d}. {track.title}"
+
+def diff_albums(previous: Optional[AlbumInfo], current: AlbumInfo) -> AlbumDiff:
+    """Compare two songlists of an album, matching tracks by song page URL"""
+    if previous is None:
+        return AlbumDiff(added=list(current.tracks), has_baseline=False)
+    
+    old_tracks = {track.song_page_url: track for track in previous.tracks}
+    new_urls = {track.song_page_url for track in current.tracks}
+    diff = AlbumDiff(removed=[track for track in previous.tracks if track.song_page_url not in new_urls])
+    
+    for track in current.tracks:
+        old = old_tracks.get(track.song_page_url)
+        if old is None:
+            diff.added.append(track)
+        elif any(getattr(old, name) != getattr(track, name) for name in TRACKED_FIELDS):
+            diff.changed.append((old, track))
+    return diff
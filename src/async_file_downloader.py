@@ -0,0 +1,152 @@
+import time
+import asyncio
+import hashlib
+import httpx
+from pathlib import Path
+from urllib.parse import urlparse
+from typing import Dict, Optional
+from .config import Config
+from .models import TrackInfo
+from .file_downloader import FileDownloader, IncompleteDownloadError
+from .retry import RetryPolicy
+from .metrics import registry
+
+class AsyncFileDownloader(FileDownloader):
+    """Coroutine based counterpart of FileDownloader.
+    
+    ``download_track`` and ``download_booklet_image`` take the same arguments
+    and return the same result, but must be awaited inside ``async with``.
+    Each host gets its own HTTP/2 client whose pool is capped at
+    ``max_connections_per_host``, so many transfers share a few connections.
+    Disk work (hashing a resumed part, copying a duplicate, stat calls,
+    completion listeners) runs in the default executor so it doesn't stall
+    the other transfers on the loop.
+    """
+    
+    def __init__(self, config: Config, retry_policy: Optional[RetryPolicy] = None):
+        super().__init__(config, retry_policy)
+        self.clients: Dict[str, httpx.AsyncClient] = {}
+        self.transfer_slots = None
+    
+    async def __aenter__(self):
+        self.transfer_slots = asyncio.Semaphore(self.config.async_transfers)
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        for client in self.clients.values():
+            await client.aclose()
+        self.clients = {}
+    
+    def _get_client(self, url: str) -> httpx.AsyncClient:
+        host = urlparse(url).netloc
+        if host not in self.clients:
+            limits = httpx.Limits(
+                max_connections=self.config.max_connections_per_host,
+                max_keepalive_connections=self.config.max_connections_per_host
+            )
+            self.clients[host] = httpx.AsyncClient(
+                http2=self.config.http2,
+                limits=limits,
+                # Transfers queue on the pool instead of timing out while waiting for a connection
+                timeout=httpx.Timeout(self.config.request_timeout, pool=None),
+                headers={'User-Agent': self.config.user_agent},
+                follow_redirects=True
+            )
+        return self.clients[host]
+    
+    async def download_track(self, url: str, album_name: str, track_info: TrackInfo, total_cds: int = 1,
+                             replace_existing: bool = False, retry_policy: Optional[RetryPolicy] = None) -> bool:
+        try:
+            filepath = self.get_track_filepath(url, album_name, track_info, total_cds)
+            if not filepath:
+                print(f"Unknown file format for URL: {url}")
+                return False
+            
+            filename = filepath.name
+            
+            # A corrected track replaces the old file once the new one is complete
+            loop = asyncio.get_running_loop()
+            if not replace_existing and await loop.run_in_executor(None, self._is_present, url, filepath):
+                print(f"Track already exists: {filename}")
+                self._record_success(url)
+                return True
+            
+            with registry.timer('transfer_seconds', host=urlparse(url).netloc):
+                await (retry_policy or self.retry_policy).call_async(self._stream_to_file, url, filepath, description=filename)
+            
+            file_size = (await loop.run_in_executor(None, filepath.stat)).st_size / (1024 * 1024)
+            print(f"Downloaded track: {filename} ({file_size:.2f} MB)")
+            self._record_success(url)
+            return True
+        
+        except Exception as e:
+            print(f"Error downloading track {url}: {e}")
+            self._record_failure(url, e)
+            return False
+    
+    async def download_booklet_image(self, url: str, album_name: str, filename: str,
+                                     retry_policy: Optional[RetryPolicy] = None) -> bool:
+        try:
+            safe_filename = self._sanitize_filename(filename)
+            filepath = self._get_booklet_filepath(album_name, safe_filename)
+            
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, self._is_present, url, filepath):
+                print(f"Booklet image already exists: {safe_filename}")
+                self._record_success(url)
+                return True
+            
+            with registry.timer('transfer_seconds', host=urlparse(url).netloc):
+                await (retry_policy or self.retry_policy).call_async(self._stream_to_file, url, filepath, description=safe_filename)
+            
+            file_size = (await loop.run_in_executor(None, filepath.stat)).st_size / (1024 * 1024)
+            print(f"Downloaded booklet: {safe_filename} ({file_size:.2f} MB)")
+            self._record_success(url)
+            return True
+        
+        except Exception as e:
+            print(f"Error downloading booklet image {url}: {e}")
+            self._record_failure(url, e)
+            return False
+    
+    async def _stream_to_file(self, url: str, filepath: Path):
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        part_path = self._get_part_path(filepath)
+        # Transfers here are single streams, so a segmented leftover from the threaded engine starts over
+        offset = self._resume_offset(filepath)
+        digest = hashlib.sha256()
+        client = self._get_client(url)
+        host = urlparse(url).netloc
+        loop = asyncio.get_running_loop()
+        
+        async with self.transfer_slots:
+            await self.rate_limiter.acquire_async(url)
+            started = time.monotonic()
+            async with client.stream('GET', url, headers=self._range_headers(offset)) as response:
+                elapsed = time.monotonic() - started
+                registry.observe('request_latency_seconds', elapsed, host=host)
+                self.rate_limiter.feedback(url, response.status_code, elapsed, response.headers.get('Retry-After'))
+                if response.status_code == 416:
+                    expected_size = self._parse_total_size(response.headers.get('Content-Range'))
+                    if expected_size is None or expected_size != offset:
+                        part_path.unlink()
+                        raise IncompleteDownloadError(f"Discarded stale partial download of {filepath.name}")
+                    await loop.run_in_executor(None, self._hash_file, part_path, digest)
+                else:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0
+                    expected_size = self._get_expected_size(response.status_code, response.headers, offset)
+                    if offset:
+                        await loop.run_in_executor(None, self._hash_file, part_path, digest)
+                    
+                    with open(part_path, 'ab' if offset else 'wb') as f:
+                        async for chunk in response.aiter_bytes(chunk_size=65536):
+                            f.write(chunk)
+                            digest.update(chunk)
+                            registry.inc('bytes_downloaded_total', len(chunk), host=host)
+                            if self.bandwidth_limiter:
+                                await self.bandwidth_limiter.consume_async(len(chunk))
+        
+        await loop.run_in_executor(None, self._finalize_part, part_path, filepath, expected_size)
+        await loop.run_in_executor(None, self._notify_complete, url, filepath, digest)
\ No newline at end of file
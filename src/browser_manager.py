@@ -1,3 +1,9 @@
+import json
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Optional
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.edge.options import Options as EdgeOptions
@@ -10,34 +16,84 @@ from webdriver_manager.microsoft import EdgeChromiumDriverManager
 from webdriver_manager.firefox import GeckoDriverManager
 from .config import Config
 
+# Ad, analytics and social hosts KHInsider pages pull in; none of them is needed to scrape
+BLOCKED_DOMAINS = [
+    'doubleclick.net',
+    'googlesyndication.com',
+    'googletagmanager.com',
+    'googletagservices.com',
+    'google-analytics.com',
+    'adservice.google.com',
+    'amazon-adsystem.com',
+    'adnxs.com',
+    'criteo.com',
+    'pubmatic.com',
+    'rubiconproject.com',
+    'taboola.com',
+    'outbrain.com',
+    'scorecardresearch.com',
+    'quantserve.com',
+    'facebook.net',
+    'connect.facebook.net',
+    'platform.twitter.com',
+    'disqus.com',
+    'fonts.googleapis.com',
+    'fonts.gstatic.com',
+]
+
+DRIVER_MANAGERS = {
+    "chrome": ChromeDriverManager,
+    "edge": EdgeChromiumDriverManager,
+    "firefox": GeckoDriverManager
+}
+
+# Resource types the lean profile refuses to fetch at all
+BLOCKED_URL_PATTERNS = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.woff', '*.woff2', '*.ttf', '*.otf']
+
 class BrowserManager:
     def __init__(self, config: Config):
         self.config = config
         self.driver = None
+        self.state_path = Path(config.browser_state_file or Path(config.output_dir) / ".browser.json")
+        # Working browser and driver paths from earlier runs, so startup needs no network
+        self.state = self._load_state()
+        # Browser that worked in auto mode, so further drivers skip the failing ones
+        self.detected_browser = self.state.get('browser')
+        self._state_lock = threading.Lock()
     
     def setup_driver(self):
-        if self.config.browser == "auto":
-            self.driver = self._try_browsers()
+        self.driver = self.create_driver()
+        return self.driver
+    
+    def create_driver(self):
+        """Start a new driver without taking ownership of it"""
+        started = time.monotonic()
+        if self.config.browser != "auto":
+            driver = self._setup_specific_browser(self.config.browser)
         else:
-            self.driver = self._setup_specific_browser(self.config.browser)
+            driver = self._try_browsers()
         
-        if not self.driver:
+        if not driver:
             raise Exception("No suitable browser found")
         
-        return self.driver
+        print(f"Browser started in {time.monotonic() - started:.1f}s")
+        return driver
     
     def _try_browsers(self):
-        browsers = [
-            ("chrome", self._setup_chrome),
-            ("edge", self._setup_edge),
-            ("firefox", self._setup_firefox)
-        ]
+        browsers = ["chrome", "edge", "firefox"]
+        if self.detected_browser in browsers:
+            # The browser that worked last time goes first, usually sparing the others
+            browsers.remove(self.detected_browser)
+            browsers.insert(0, self.detected_browser)
         
-        for browser_name, setup_func in browsers:
+        for browser_name in browsers:
             try:
                 print(f"Trying {browser_name}...")
-                driver = setup_func()
+                driver = self._setup_specific_browser(browser_name)
                 print(f"Successfully initialized {browser_name}")
+                if self.detected_browser != browser_name:
+                    self.detected_browser = browser_name
+                    self._remember_browser(browser_name)
                 return driver
             except Exception as e:
                 print(f"Failed to initialize {browser_name}: {e}")
@@ -55,33 +111,93 @@ class BrowserManager:
         if browser_name not in setup_functions:
             raise ValueError(f"Unsupported browser: {browser_name}")
         
-        return setup_functions[browser_name]()
+        cached_path = self._get_cached_driver_path(browser_name)
+        if cached_path:
+            try:
+                return setup_functions[browser_name](cached_path)
+            except Exception as e:
+                # Typically a browser update the cached driver no longer matches
+                print(f"Cached {browser_name} driver failed ({e}), resolving it again")
+                self._remember_driver_path(browser_name, None)
+        
+        driver_path = self._resolve_driver_path(browser_name)
+        driver = setup_functions[browser_name](driver_path)
+        if driver_path:
+            self._remember_driver_path(browser_name, driver_path)
+        return driver
+    
+    def _get_cached_driver_path(self, browser_name) -> Optional[str]:
+        with self._state_lock:
+            driver_path = self.state.get('driver_paths', {}).get(browser_name)
+        return driver_path if driver_path and os.path.isfile(driver_path) else None
+    
+    def _resolve_driver_path(self, browser_name) -> Optional[str]:
+        started = time.monotonic()
+        try:
+            driver_path = DRIVER_MANAGERS[browser_name]().install()
+            print(f"Resolved {browser_name} driver in {time.monotonic() - started:.1f}s")
+            return driver_path
+        except Exception as e:
+            # Offline: leave it to Selenium's own lookup (PATH or Selenium Manager's cache)
+            print(f"Could not download {browser_name} driver ({e}), looking for a local one")
+            return None
     
-    def _setup_chrome(self):
+    def _load_state(self) -> dict:
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _remember_browser(self, browser_name):
+        with self._state_lock:
+            self.state['browser'] = browser_name
+            self._save_state()
+    
+    def _remember_driver_path(self, browser_name, driver_path: Optional[str]):
+        with self._state_lock:
+            driver_paths = self.state.setdefault('driver_paths', {})
+            if driver_path:
+                driver_paths[browser_name] = driver_path
+            else:
+                driver_paths.pop(browser_name, None)
+            self._save_state()
+    
+    def _save_state(self):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.state_path.with_name(self.state_path.name + '.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f, indent=2)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            print(f"Could not save browser state: {e}")
+    
+    def _setup_chrome(self, driver_path=None):
         options = ChromeOptions()
         self._configure_chrome_options(options)
         
-        service = ChromeService(ChromeDriverManager().install())
+        service = ChromeService(driver_path)
         driver = webdriver.Chrome(service=service, options=options)
         self._configure_chrome_driver(driver)
         
         return driver
     
-    def _setup_edge(self):
+    def _setup_edge(self, driver_path=None):
         options = EdgeOptions()
         self._configure_edge_options(options)
         
-        service = EdgeService(EdgeChromiumDriverManager().install())
+        service = EdgeService(driver_path)
         driver = webdriver.Edge(service=service, options=options)
         self._configure_edge_driver(driver)
         
         return driver
     
-    def _setup_firefox(self):
+    def _setup_firefox(self, driver_path=None):
         options = FirefoxOptions()
         self._configure_firefox_options(options)
         
-        service = FirefoxService(GeckoDriverManager().install())
+        service = FirefoxService(driver_path)
         driver = webdriver.Firefox(service=service, options=options)
         
         return driver
@@ -92,6 +208,9 @@ class BrowserManager:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         
+        if self.config.lean_browser:
+            self._configure_lean_chromium_options(options)
+        
         if self.config.headless:
             options.add_argument('--headless')
     
@@ -101,20 +220,52 @@ class BrowserManager:
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
         
+        if self.config.lean_browser:
+            self._configure_lean_chromium_options(options)
+        
         if self.config.headless:
             options.add_argument('--headless')
     
     def _configure_firefox_options(self, options):
         options.set_preference("general.useragent.override", self.config.user_agent)
         
+        if self.config.lean_browser:
+            # Don't wait for subresources once the HTML is parsed
+            options.page_load_strategy = 'eager'
+            options.set_preference("permissions.default.image", 2)
+            options.set_preference("gfx.downloadable_fonts.enabled", False)
+            options.set_preference("media.autoplay.default", 5)
+            # Firefox has no per-host block list, so rely on strict tracking protection for ads and trackers
+            options.set_preference("browser.contentblocking.category", "strict")
+            options.set_preference("privacy.trackingprotection.enabled", True)
+            options.set_preference("privacy.trackingprotection.socialtracking.enabled", True)
+        
         if self.config.headless:
             options.add_argument('--headless')
     
-    def _configure_chrome_driver(self, driver):
+    def _configure_lean_chromium_options(self, options):
+        # Don't wait for subresources once the HTML is parsed
+        options.page_load_strategy = 'eager'
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--mute-audio')
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+        # Unresolvable hosts fail instantly instead of being fetched
+        rules = ', '.join(f'MAP {domain} ~NOTFOUND, MAP *.{domain} ~NOTFOUND' for domain in BLOCKED_DOMAINS)
+        options.add_argument(f'--host-resolver-rules={rules}')
+    
+    def _configure_chromium_driver(self, driver):
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        if self.config.lean_browser:
+            # Also catches images and fonts served from the site's own hosts
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    
+    def _configure_chrome_driver(self, driver):
+        self._configure_chromium_driver(driver)
     
     def _configure_edge_driver(self, driver):
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        self._configure_chromium_driver(driver)
     
     def quit(self):
         if self.driver:
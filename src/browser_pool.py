@@ -0,0 +1,129 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional
+from selenium.common.exceptions import WebDriverException
+from .config import Config
+from .browser_manager import BrowserManager
+from .scraper import KHInsiderScraper
+from .models import AlbumInfo
+from .rate_limiter import AdaptiveRateLimiter
+from .metrics import registry
+
+class PooledBrowser:
+    __slots__ = ('driver', 'page_loads', 'broken')
+    
+    def __init__(self, driver):
+        self.driver = driver
+        self.page_loads = 0
+        self.broken = False
+
+class BrowserPool:
+    """A fixed number of warmed-up drivers that callers check out one at a time.
+    
+    A driver that fails its health check, raises a WebDriverException or has
+    loaded ``max_page_loads`` pages is quit and replaced on return, which keeps
+    memory leaks and crashed browsers from piling up over long batches.
+    """
+    
+    def __init__(self, browser_manager: BrowserManager, size: int, max_page_loads: int = 0):
+        self.browser_manager = browser_manager
+        self.size = size
+        self.max_page_loads = max_page_loads
+        self.recycled = 0
+        self._available = queue.Queue()
+        self._browsers: List[PooledBrowser] = []
+        self._lock = threading.Lock()
+    
+    def start(self):
+        started = time.monotonic()
+        # The first driver settles which browser works in auto mode, the rest start in parallel
+        self._add_browser()
+        if self.size > 1:
+            with ThreadPoolExecutor(max_workers=self.size - 1) as executor:
+                list(executor.map(lambda _: self._add_browser(), range(self.size - 1)))
+        print(f"Browser pool ready with {self.size} browsers in {time.monotonic() - started:.1f}s")
+    
+    @contextmanager
+    def checkout(self):
+        browser = self._available.get()
+        try:
+            if not self._is_healthy(browser):
+                browser = self._replace(browser, "failed health check")
+            yield browser.driver
+        except WebDriverException:
+            browser.broken = True
+            raise
+        finally:
+            browser.page_loads += 1
+            self._available.put(self._recycle_if_needed(browser))
+    
+    def close(self):
+        with self._lock:
+            browsers, self._browsers = self._browsers, []
+        for browser in browsers:
+            self._quit(browser)
+    
+    def _add_browser(self) -> PooledBrowser:
+        browser = PooledBrowser(self.browser_manager.create_driver())
+        with self._lock:
+            self._browsers.append(browser)
+        self._available.put(browser)
+        return browser
+    
+    def _recycle_if_needed(self, browser: PooledBrowser) -> PooledBrowser:
+        try:
+            if browser.broken:
+                return self._replace(browser, "crashed")
+            if self.max_page_loads and browser.page_loads >= self.max_page_loads:
+                return self._replace(browser, f"reached {browser.page_loads} page loads")
+        except Exception as e:
+            # Keep the slot; the next checkout's health check tries again
+            print(f"Could not start a replacement browser: {e}")
+        return browser
+    
+    def _replace(self, browser: PooledBrowser, reason: str) -> PooledBrowser:
+        print(f"Recycling browser ({reason})")
+        self._quit(browser)
+        replacement = PooledBrowser(self.browser_manager.create_driver())
+        with self._lock:
+            if browser in self._browsers:
+                self._browsers.remove(browser)
+            self._browsers.append(replacement)
+            self.recycled += 1
+        return replacement
+    
+    def _is_healthy(self, browser: PooledBrowser) -> bool:
+        try:
+            browser.driver.execute_script('return 1')
+            return True
+        except WebDriverException:
+            return False
+    
+    def _quit(self, browser: PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+
+class PooledScraper:
+    """KHInsiderScraper interface spread over the drivers of a BrowserPool"""
+    
+    def __init__(self, pool: BrowserPool, config: Config, rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        self.pool = pool
+        self.config = config
+        self.rate_limiter = rate_limiter
+        self.ready_histogram = registry.histogram('page_ready_seconds')
+    
+    def get_album_info(self, url: str) -> AlbumInfo:
+        with self.pool.checkout() as driver:
+            return self._create_scraper(driver).get_album_info(url)
+    
+    def get_download_urls(self, song_page_url: str) -> Tuple[str, List[str]]:
+        with self.pool.checkout() as driver:
+            return self._create_scraper(driver).get_download_urls(song_page_url)
+    
+    def _create_scraper(self, driver) -> KHInsiderScraper:
+        return KHInsiderScraper(driver, self.config, self.rate_limiter, self.ready_histogram)
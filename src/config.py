@@ -5,9 +5,70 @@ from typing import Literal
 class Config:
     output_dir: str = "downloads"
     audio_format: Literal["mp3", "flac", "both"] = "both"
+    # Which of the formats above each track gets: all, flac where offered, the smallest file,
+    # or all but nothing for tracks the library already holds in any format
+    format_policy: Literal["all", "prefer-flac", "smallest", "skip-owned"] = "all"
     browser: Literal["chrome", "edge", "firefox", "auto"] = "auto"
     headless: bool = False
+    # Skip images, fonts, ads and trackers and stop loading once the HTML is parsed
+    lean_browser: bool = True
+    # Remembers the working browser and driver path; defaults to output_dir/.browser.json
+    browser_state_file: str = ""
+    scraper_backend: Literal["selenium", "http"] = "selenium"
+    request_timeout: float = 30.0
+    # Song pages resolved in parallel; the Selenium backend starts one browser for each
+    page_workers: int = 1
+    browser_recycle_after: int = 200
+    # Longest wait for a loaded page's songlist or download links to appear
+    page_ready_timeout: float = 10.0
+    # Initial spacing between requests to one host; the rate then adapts
     download_delay: float = 1.0
     page_delay: float = 2.0
+    adaptive_rate: bool = True
+    min_request_rate: float = 0.1
+    max_request_rate: float = 10.0
+    slow_response: float = 5.0
+    max_retries: int = 4
+    retry_base_delay: float = 1.0
+    retry_max_delay: float = 60.0
+    retry_budget: int = 500
+    download_workers: int = 4
+    album_workers: int = 1
+    # Order among albums downloading together: fewest tracks first, or input order
+    album_priority: Literal["smallest", "fifo"] = "smallest"
+    # Total download rate across all transfers in MB/s; 0 for no cap
+    max_bandwidth_mb: float = 0.0
+    max_connections_per_host: int = 2
+    download_segments: int = 4
+    segment_threshold_mb: float = 32.0
+    download_engine: Literal["threads", "async"] = "threads"
+    async_transfers: int = 16
+    http2: bool = True
     download_booklet: bool = True
+    use_journal: bool = True
+    # Index of downloaded files by URL and SHA-256; identical files become hardlinks
+    use_content_index: bool = True
+    # Index of owned tracks and completed albums, consulted before anything is scraped
+    use_library: bool = True
+    # Re-read each album's songlist and only fetch tracks added or changed since the last complete run
+    sync: bool = False
+    hardlink_duplicates: bool = True
+    # Write album, title, track/disc number and length tags after download (needs mutagen)
+    tag_files: bool = False
+    # Derive an MP3 from tracks only offered as FLAC, with format "both" (needs ffmpeg)
+    transcode_mp3: bool = False
+    mp3_bitrate: str = "320k"
+    # Processes for tagging and transcoding; 0 uses every core
+    post_workers: int = 0
+    use_cache: bool = True
+    # JSON-lines log of every request, transfer, retry and sleep; off when empty
+    metrics_log: str = ""
+    # Prometheus text-format file rewritten every second during a run; off when empty
+    metrics_file: str = ""
+    # Aggregate progress bar on stderr, drawn only when it is a terminal
+    progress_bar: bool = True
+    refresh: bool = False
+    cache_file: str = ""
+    cache_ttl: float = 7 * 24 * 3600
+    cache_max_entries: int = 100000
     user_agent: str = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
\ No newline at end of file
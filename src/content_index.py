@@ -0,0 +1,111 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Optional, Dict
+
+class ContentIndex:
+    """SQLite index of every downloaded file: its source URL, size and SHA-256.
+    
+    It lets the downloader recognise content it already has, whether under
+    the same URL or, after the fact, with the same hash, and hardlink the
+    existing copy instead of keeping a second one. ``verify`` re-hashes the
+    indexed library to find files that went missing or were corrupted.
+    """
+    
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'path TEXT PRIMARY KEY, url TEXT NOT NULL, size INTEGER NOT NULL, '
+                'sha256 TEXT NOT NULL, recorded_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_url ON files (url)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_content ON files (sha256, size)')
+    
+    def record_file(self, url: str, filepath: Path, size: int, sha256: str):
+        """Completion listener for FileDownloader"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO files (path, url, size, sha256, recorded_at) VALUES (?, ?, ?, ?, ?)',
+                (self._key(filepath), url, size, sha256, time.time())
+            )
+    
+    def get_file(self, filepath: Path) -> Optional[Tuple[int, str]]:
+        """Size and hash recorded for a path"""
+        with self._lock:
+            row = self._conn.execute('SELECT size, sha256 FROM files WHERE path = ?', (self._key(filepath),)).fetchone()
+        return (row[0], row[1]) if row else None
+    
+    def find_by_url(self, url: str, exclude: Optional[Path] = None) -> Optional[Tuple[Path, int, str]]:
+        """An intact file already downloaded from url, other than exclude"""
+        with self._lock:
+            rows = self._conn.execute('SELECT path, size, sha256 FROM files WHERE url = ?', (url,)).fetchall()
+        return self._first_intact(rows, exclude)
+    
+    def find_by_content(self, size: int, sha256: str, exclude: Optional[Path] = None) -> Optional[Path]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT path, size, sha256 FROM files WHERE sha256 = ? AND size = ?', (sha256, size)
+            ).fetchall()
+        found = self._first_intact(rows, exclude)
+        return found[0] if found else None
+    
+    def forget(self, filepath: Path):
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM files WHERE path = ?', (self._key(filepath),))
+    
+    def verify(self, workers: int = 4) -> Dict[str, List[str]]:
+        """Re-hash every indexed file; returns the paths that are missing or corrupted"""
+        with self._lock:
+            rows = self._conn.execute('SELECT path, size, sha256 FROM files ORDER BY path').fetchall()
+        
+        def check(row):
+            path, size, sha256 = row
+            filepath = Path(path)
+            if not filepath.is_file():
+                return 'missing', path
+            if filepath.stat().st_size != size or self.hash_file(filepath) != sha256:
+                return 'corrupted', path
+            return 'ok', path
+        
+        report = {'ok': [], 'missing': [], 'corrupted': []}
+        # hashlib releases the GIL, so threads hash files in parallel
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for status, path in executor.map(check, rows):
+                report[status].append(path)
+        return report
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _first_intact(self, rows, exclude: Optional[Path]) -> Optional[Tuple[Path, int, str]]:
+        for path, size, sha256 in rows:
+            filepath = Path(path)
+            if exclude is not None and path == self._key(exclude):
+                continue
+            # A size check is cheap; a full re-hash is left to verify
+            if filepath.is_file() and filepath.stat().st_size == size:
+                return filepath, size, sha256
+        return None
+    
+    @staticmethod
+    def _key(filepath: Path) -> str:
+        # Absolute, so the index works whatever directory the downloader runs from
+        return str(Path(filepath).absolute())
+    
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,221 @@
+"""Long-running download service with a local HTTP/JSON API.
+
+Album URLs submitted to the API go into a persistent queue and are
+downloaded by one downloader that stays open between jobs, so its HTTP
+sessions, metadata cache, indexes and browsers are warm for every job
+after the first.
+
+POST   /jobs          {"urls": [...]} or {"url": "..."}: queue albums
+GET    /jobs          recent jobs, ?status= and ?limit= to filter
+GET    /jobs/<id>     one job, with the album result once finished
+DELETE /jobs/<id>     cancel a job that hasn't started
+GET    /status        job counts and download throughput
+GET    /metrics       every counter and histogram in Prometheus text format
+"""
+
+import json
+import time
+import threading
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import List, Optional, Set
+from .config import Config
+from .downloader import VideoGameMusicDownloader
+from .job_queue import JobQueue
+from .models import AlbumResult
+from .metrics import registry
+
+class DownloadService:
+    """Runs queued jobs on a persistent downloader. Each of album_workers worker
+    threads takes one job at a time, so a free slot picks up the next job at once."""
+    
+    def __init__(self, config: Config):
+        self.config = config
+        self.queue = JobQueue(Path(config.output_dir) / ".queue.sqlite")
+        self.downloader = VideoGameMusicDownloader(config)
+        self.started_at = time.time()
+        # Seconds with at least one job running, for the average download rate
+        self.busy_seconds = 0.0
+        self.running: Set[int] = set()
+        self._busy_since = 0.0
+        self._condition = threading.Condition()
+        # Bumped on every submission, so a worker can't miss one between claiming and waiting
+        self._submissions = 0
+        self._stop = False
+        self._threads: List[threading.Thread] = []
+    
+    def submit(self, album_url: str) -> int:
+        job_id = self.queue.add(album_url)
+        with self._condition:
+            self._submissions += 1
+            self._condition.notify()
+        return job_id
+    
+    def start(self):
+        self.downloader.start()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"job-{index}", daemon=True)
+            for index in range(max(1, self.config.album_workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """Let the running jobs finish, then release the downloader"""
+        with self._condition:
+            self._stop = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        self.downloader.close()
+        self.queue.close()
+    
+    def status(self) -> dict:
+        downloaded = registry.get('bytes_downloaded_total')
+        with self._condition:
+            running = sorted(self.running)
+            busy = self.busy_seconds + (time.monotonic() - self._busy_since if running else 0.0)
+        return {
+            'uptime': round(time.time() - self.started_at, 3),
+            'jobs': self.queue.counts(),
+            'running': running,
+            'files_completed': int(registry.get('files_completed_total')),
+            'files_failed': int(registry.get('files_failed_total')),
+            'bytes_downloaded': int(downloaded),
+            'mb_per_second': round(downloaded / (1024 * 1024) / busy, 3) if busy else 0.0,
+        }
+    
+    def _work(self):
+        while True:
+            with self._condition:
+                if self._stop:
+                    return
+                seen = self._submissions
+            jobs = self.queue.claim(1)
+            if not jobs:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._stop or self._submissions != seen)
+                continue
+            
+            job_id, album_url = jobs[0]
+            self._job_started(job_id)
+            try:
+                result = self.downloader.run_job(album_url)
+            except Exception as e:
+                print(f"Error running job {job_id}: {e}")
+                result = AlbumResult(url=album_url, error=str(e))
+            self.queue.finish(job_id, result)
+            self._job_finished(job_id)
+    
+    def _job_started(self, job_id: int):
+        with self._condition:
+            if not self.running:
+                self._busy_since = time.monotonic()
+            self.running.add(job_id)
+    
+    def _job_finished(self, job_id: int):
+        with self._condition:
+            self.running.discard(job_id)
+            if not self.running:
+                self.busy_seconds += time.monotonic() - self._busy_since
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = 'VGMDownloader'
+    
+    def log_message(self, format, *args):
+        pass
+    
+    @property
+    def service(self) -> DownloadService:
+        return self.server.service
+    
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/')
+        if path == '/status':
+            self._send_json(200, self.service.status())
+        elif path == '/metrics':
+            self._send(200, registry.render_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        elif path == '/jobs':
+            query = parse_qs(parsed.query)
+            status = query.get('status', [None])[0]
+            try:
+                limit = int(query.get('limit', [100])[0])
+            except ValueError:
+                self._send_json(400, {'error': 'limit must be a number'})
+                return
+            self._send_json(200, {'jobs': self.service.queue.recent(status, limit)})
+        elif self._job_id(path) is not None:
+            job = self.service.queue.get(self._job_id(path))
+            if job:
+                self._send_json(200, job)
+            else:
+                self._send_json(404, {'error': 'no such job'})
+        else:
+            self._send_json(404, {'error': 'not found'})
+    
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length) or b'{}')
+            urls = body['urls'] if 'urls' in body else [body['url']]
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {'error': 'expected {"urls": [...]} or {"url": "..."}'})
+            return
+        if not urls or not all(isinstance(url, str) and url.startswith('http') for url in urls):
+            self._send_json(400, {'error': 'album URLs must be http(s) URLs'})
+            return
+        
+        jobs = [self.service.queue.get(self.service.submit(url)) for url in urls]
+        self._send_json(201, {'jobs': jobs})
+    
+    def do_DELETE(self):
+        job_id = self._job_id(urlparse(self.path).path.rstrip('/'))
+        if job_id is None or not self.service.queue.get(job_id):
+            self._send_json(404, {'error': 'no such job'})
+        elif self.service.queue.cancel(job_id):
+            self._send_json(200, self.service.queue.get(job_id))
+        else:
+            self._send_json(409, {'error': 'only queued jobs can be cancelled'})
+    
+    def _job_id(self, path: str) -> Optional[int]:
+        prefix = '/jobs/'
+        if path.startswith(prefix) and path[len(prefix):].isdigit():
+            return int(path[len(prefix):])
+        return None
+    
+    def _send_json(self, status: int, data):
+        self._send(status, json.dumps(data).encode('utf-8'), 'application/json')
+    
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(config: Config, host: str, port: int, album_urls: List[str] = ()):
+    """Run the service until interrupted; album_urls given on the command line are queued first"""
+    service = DownloadService(config)
+    for album_url in album_urls:
+        service.submit(album_url)
+    
+    httpd = ThreadingHTTPServer((host, port), ApiHandler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    service.start()
+    print(f"Serving on http://{host}:{httpd.server_address[1]} "
+          f"({service.queue.counts()['queued']} jobs queued)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping: finishing running jobs, press Ctrl+C again to quit now "
+              "(interrupted jobs resume on the next start)")
+    finally:
+        httpd.server_close()
+    service.stop()
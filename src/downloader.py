@@ -1,67 +1,604 @@
 import time
+import asyncio
+import itertools
+import threading
+from collections import deque
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional, Iterable, Iterator, Set
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
 from .config import Config
 from .browser_manager import BrowserManager
-from .scraper import KHInsiderScraper
+from .browser_pool import BrowserPool, PooledScraper
+from .http_scraper import HTTPScraper
 from .file_downloader import FileDownloader
-from .models import AlbumInfo
+from .metadata_cache import MetadataCache, CachedScraper
+from .journal import DownloadJournal
+from .content_index import ContentIndex
+from .library_index import LibraryIndex
+from .album_sync import AlbumDiff, diff_albums
+from .rate_limiter import AdaptiveRateLimiter
+from .retry import RetryPolicy, ParseError
+from .metrics import registry
+from .progress import ProgressReporter
+from .scheduler import FairScheduler, AsyncFairSlots
+from .post_processor import PostProcessor, build_tags
+from .models import AlbumInfo, TrackInfo, AlbumResult
 
 class VideoGameMusicDownloader:
     def __init__(self, config: Config):
         self.config = config
         self.browser_manager = BrowserManager(config)
-        self.file_downloader = FileDownloader(config)
-        self.driver = None
+        self.page_rate_limiter = AdaptiveRateLimiter.from_delay(config.page_delay, config, name="Page")
+        # One policy, and so one retry budget, for scraping and transfers of a run; service jobs get their own
+        self.retry_policy = RetryPolicy.from_config(config)
+        self.file_downloader = self._create_file_downloader()
+        # Set by Ctrl+C: albums stop queuing work and running transfers end early
+        self.stopping = self.file_downloader.stopping
+        self.browser_pool = None
         self.scraper = None
+        self.browser_scraper = None
+        self.metadata_cache = None
+        self.journal = None
+        self.content_index = None
+        self.library = None
+        self.download_scheduler = None
+        self.transfer_slots = None
+        self.resolve_executor = None
+        self.progress = None
+        self.post_processor = None
+        # Paths transferred during this run, so only fresh files are tagged and transcoded
+        self.fresh_files: Set[str] = set()
+        self.browser_lock = threading.Lock()
+        # Set between start() and close(), when runs share one set of sessions, indexes and browsers
+        self.persistent = False
+        # Event loop the async engine keeps running between start() and close()
+        self.loop = None
+        self.loop_thread = None
     
-    def download_album(self, album_url: str):
+    def start(self):
+        """Open the caches, indexes, worker pools and sessions once for a series of jobs, as a
+        long-running service does; close() releases them. Otherwise each run opens its own."""
+        self._initialize()
+        if self.config.download_engine == "async":
+            self.loop = asyncio.new_event_loop()
+            self.loop_thread = threading.Thread(target=self.loop.run_forever, name="event-loop", daemon=True)
+            self.loop_thread.start()
+            self._run_on_loop(self._open_async())
+        self.persistent = True
+    
+    def close(self):
+        self.persistent = False
+        if self.loop:
+            self._run_on_loop(self.file_downloader.__aexit__(None, None, None))
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+            self.loop = None
+            self.loop_thread = None
+        self._cleanup()
+    
+    def run_job(self, album_url: str) -> AlbumResult:
+        """Download one album on a started downloader. Jobs may run from several threads at
+        once and share its worker pools, but each has a retry budget of its own."""
+        retry_policy = RetryPolicy.from_config(self.config)
+        if self.loop:
+            return self._run_on_loop(self._download_album_safely_async(album_url, retry_policy))
+        return self._download_album_safely(album_url, retry_policy)
+    
+    def _run_on_loop(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+    
+    async def _open_async(self):
+        self.transfer_slots = AsyncFairSlots(self.config.async_transfers)
+        await self.file_downloader.__aenter__()
+    
+    def download_album(self, album_url: str) -> AlbumResult:
+        return self.download_albums([album_url])[0]
+    
+    def download_albums(self, album_urls: List[str]) -> List[AlbumResult]:
+        """Download several albums with one browser, session and worker pool"""
+        started = time.monotonic()
+        baseline = self._time_totals()
+        if self.persistent:
+            results = self._map_albums(self.run_job, album_urls)
+        else:
+            self.retry_policy.reset()
+            self.stopping.clear()
+            try:
+                self._initialize()
+                if self.config.download_engine == "async":
+                    results = asyncio.run(self._download_albums_async(album_urls))
+                else:
+                    results = self._map_albums(self._download_album_safely, album_urls)
+            except KeyboardInterrupt:
+                self._stop()
+                raise
+            finally:
+                self._cleanup()
+        
+        if len(album_urls) > 1:
+            self._print_batch_summary(results)
+        self._print_time_breakdown(time.monotonic() - started, baseline)
+        return results
+    
+    def _map_albums(self, job, album_urls: List[str]) -> List[AlbumResult]:
+        executor = ThreadPoolExecutor(max_workers=self.config.album_workers)
         try:
-            self._initialize()
-            self._download_album_content(album_url)
-        finally:
-            self._cleanup()
+            results = list(executor.map(job, album_urls))
+        except KeyboardInterrupt:
+            # Albums still running wind down on their own once the stop flag is set
+            self._stop()
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+        return results
+    
+    def _stop(self):
+        """Drop queued song pages and transfers and end the running transfers, whose .part
+        files and journal entries let the next run resume where this one stopped"""
+        self.stopping.set()
+        if self.download_scheduler:
+            self.download_scheduler.shutdown(wait=False, cancel=True)
+        if self.resolve_executor:
+            self.resolve_executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _create_file_downloader(self) -> FileDownloader:
+        if self.config.download_engine == "async":
+            # Imported lazily so the threaded engine doesn't require httpx
+            from .async_file_downloader import AsyncFileDownloader
+            return AsyncFileDownloader(self.config, self.retry_policy)
+        return FileDownloader(self.config, self.retry_policy)
     
     def _initialize(self):
-        print("Initializing browser...")
-        self.driver = self.browser_manager.setup_driver()
-        self.scraper = KHInsiderScraper(self.driver, self.config)
+        if self.config.metrics_log:
+            registry.open_log(Path(self.config.metrics_log))
+        self.progress = ProgressReporter(
+            registry,
+            show_bar=self.config.progress_bar,
+            metrics_file=Path(self.config.metrics_file) if self.config.metrics_file else None
+        )
+        self.progress.start()
+        
+        # Shared by all albums so the worker limit is global; albums get equal shares of it
+        self.download_scheduler = FairScheduler(self.config.download_workers)
+        # Song pages of every album are resolved by one pool, one worker per browser
+        self.resolve_executor = ThreadPoolExecutor(max_workers=self.config.page_workers)
+        
+        if self.config.use_journal:
+            self.journal = DownloadJournal(Path(self.config.output_dir) / ".journal.sqlite")
+            self.file_downloader.completion_listeners.append(self.journal.record_file)
+        
+        if self.config.use_library:
+            self.library = LibraryIndex(Path(self.config.output_dir) / ".library.sqlite")
+        
+        if self.config.use_content_index:
+            self.content_index = self._open_content_index()
+            self.file_downloader.content_index = self.content_index
+            self.file_downloader.completion_listeners.append(self.content_index.record_file)
+        
+        if self.config.tag_files or self.config.transcode_mp3:
+            self.post_processor = PostProcessor(self.config)
+            if self.post_processor.enabled:
+                self.file_downloader.completion_listeners.append(self._remember_fresh_file)
+        
+        if self.config.use_cache:
+            cache_file = self.config.cache_file or Path(self.config.output_dir) / ".metadata_cache.sqlite"
+            self.metadata_cache = MetadataCache(Path(cache_file), self.config.cache_ttl, self.config.cache_max_entries)
+            # The browser is only started once the cache can't answer
+            self.scraper = CachedScraper(self.metadata_cache, self._create_scraper, self.config)
+        else:
+            self.scraper = self._create_scraper()
+    
+    def _open_content_index(self) -> ContentIndex:
+        return ContentIndex(Path(self.config.output_dir) / ".content_index.sqlite")
+    
+    def verify_library(self) -> Dict[str, List[str]]:
+        """Re-hash every indexed file. Missing files are dropped from the indexes and corrupted
+        ones renamed to *.corrupt, and their albums lose their complete mark in the library,
+        so the next download of those albums fetches them again."""
+        content_index = self._open_content_index()
+        try:
+            report = content_index.verify(self.config.download_workers)
+            for path in report['missing']:
+                content_index.forget(Path(path))
+            for path in report['corrupted']:
+                filepath = Path(path)
+                filepath.replace(filepath.with_name(filepath.name + '.corrupt'))
+                content_index.forget(filepath)
+        finally:
+            content_index.close()
+        
+        lost = [Path(path) for path in report['missing'] + report['corrupted']]
+        if lost and self.config.use_library:
+            library = LibraryIndex(Path(self.config.output_dir) / ".library.sqlite")
+            try:
+                albums = library.forget_files(lost, {self._album_dir(path) for path in lost})
+            finally:
+                library.close()
+            if albums:
+                print(f"Marked {len(albums)} albums incomplete in the library")
+        
+        print(f"Verified {len(report['ok'])} files")
+        for status in ('missing', 'corrupted'):
+            if report[status]:
+                print(f"{status.capitalize()} ({len(report[status])}):")
+                for path in report[status]:
+                    print(f"  {path}")
+        return report
+    
+    def _album_dir(self, path: Path) -> Path:
+        """Album folder holding a downloaded file: output_dir/Album Name"""
+        output_dir = Path(self.config.output_dir).absolute()
+        try:
+            return output_dir / path.absolute().relative_to(output_dir).parts[0]
+        except (ValueError, IndexError):
+            return path.parent
+    
+    def _create_scraper(self):
+        if self.config.scraper_backend == "http":
+            return HTTPScraper(
+                self.file_downloader.session,
+                self.config,
+                fallback=self._get_browser_scraper,
+                rate_limiter=self.page_rate_limiter
+            )
+        return self._get_browser_scraper()
+    
+    def _get_browser_scraper(self) -> PooledScraper:
+        with self.browser_lock:
+            if not self.browser_scraper:
+                print("Initializing browser...")
+                self.browser_pool = BrowserPool(
+                    self.browser_manager, self.config.page_workers, self.config.browser_recycle_after
+                )
+                self.browser_pool.start()
+                self.browser_scraper = PooledScraper(self.browser_pool, self.config, self.page_rate_limiter)
+            return self.browser_scraper
     
-    def _download_album_content(self, album_url: str):
-        print("Extracting album information...")
-        album_info = self.scraper.get_album_info(album_url)
+    def _download_album_safely(self, album_url: str, retry_policy: Optional[RetryPolicy] = None) -> AlbumResult:
+        try:
+            return self._download_album_content(album_url, retry_policy or self.retry_policy)
+        except Exception as e:
+            print(f"Error downloading album {album_url}: {e}")
+            return AlbumResult(url=album_url, error=str(e))
+    
+    def _get_album_info(self, album_url: str, retry_policy: RetryPolicy) -> AlbumInfo:
+        album_info = None
+        # Sync compares against the live songlist, so neither journal nor cache may answer
+        if self.journal and not self.config.refresh and not self.config.sync:
+            album_info = self.journal.get_album(album_url)
+            if album_info:
+                print("Resuming unfinished album from journal")
+        
+        if not album_info:
+            if self.config.sync and self.metadata_cache:
+                self.metadata_cache.forget_album(album_url)
+            print("Extracting album information...")
+            with registry.timer('scrape_seconds', page='album'):
+                album_info = retry_policy.call(
+                    self.scraper.get_album_info, album_url, description=f"album page {album_url}"
+                )
+            if self.journal and album_info.tracks:
+                self.journal.record_album(album_url, album_info)
         
         print(f"Album: {album_info.name}")
         print(f"Found {len(album_info.tracks)} tracks")
         print(f"Found {len(album_info.booklet_images)} booklet images")
+        return album_info
+    
+    def _get_complete_album(self, album_url: str) -> Optional[AlbumResult]:
+        """Result for an album the library already has in full, without fetching anything"""
+        complete = self.library.get_complete_album(album_url, self._completion_format()) if self.library else None
+        if not complete:
+            return None
+        name, files = complete
+        print(f"Album already complete: {name} ({files} files)")
+        return AlbumResult(url=album_url, name=name, total_files=files, successful_files=files, skipped=True)
+    
+    def _diff_album(self, album_info: AlbumInfo, result: AlbumResult) -> Optional[AlbumDiff]:
+        """Songlist changes since the album's last complete download, in sync mode"""
+        if not (self.config.sync and self.library):
+            return None
+        diff = diff_albums(self.library.get_snapshot(result.url), album_info)
+        if not diff.has_baseline:
+            print("No earlier snapshot of this album, checking every track")
+        elif diff.is_empty():
+            print("No changes since the last sync")
+        else:
+            result.changes = diff.describe()
+            print(f"Changes since the last sync ({len(result.changes)}):")
+            for line in result.changes:
+                print(f"  {line}")
+        return diff
+    
+    def _download_album_content(self, album_url: str, retry_policy: RetryPolicy) -> AlbumResult:
+        complete = None if self.config.sync else self._get_complete_album(album_url)
+        if complete:
+            return complete
+        
+        album_info = self._get_album_info(album_url, retry_policy)
+        result = AlbumResult(url=album_url, name=album_info.name, total_tracks=len(album_info.tracks))
+        diff = self._diff_album(album_info, result)
         
-        # Download booklet images
+        # Booklet images transfer alongside the tracks
+        booklet_futures = []
         if self.config.download_booklet and album_info.booklet_images:
-            self._download_booklet_images(album_info)
+            booklet_futures = self._queue_booklet_images(album_info, result, retry_policy)
         
         # Download tracks
         if album_info.tracks:
-            self._download_tracks(album_info)
+            self._download_tracks(album_info, result, diff, retry_policy)
         else:
             print("No tracks found!")
+        
+        if booklet_futures:
+            booklet_results = []
+            for future in booklet_futures:
+                try:
+                    booklet_results.append(future.result())
+                except CancelledError:
+                    booklet_results.append(False)
+            self._record_booklet_results(album_info, result, booklet_results)
+        
+        self._finish_album(result, album_info)
+        return result
     
-    def _download_booklet_images(self, album_info: AlbumInfo):
-        print("\n=== Downloading Booklet Images ===")
-        booklet_success = 0
+    def _resolve_track(self, album_url: str, track: TrackInfo, fresh: bool,
+                       retry_policy: RetryPolicy) -> Tuple[str, List[str]]:
+        """Download URLs of a track, from the journal if an earlier run already resolved them
+        (unless fresh, for tracks that changed since)"""
+        if self.journal and not fresh:
+            resolved = self.journal.get_song_page(track.song_page_url, self.config.audio_format)
+            if resolved:
+                return resolved
+        if fresh and self.metadata_cache:
+            self.metadata_cache.forget_download_urls(track.song_page_url)
         
-        for i, booklet_image in enumerate(album_info.booklet_images, 1):
-            print(f"Downloading booklet image {i}/{len(album_info.booklet_images)}: {booklet_image.filename}")
-            
-            if self.file_downloader.download_booklet_image(
-                booklet_image.url, 
-                album_info.name, 
-                booklet_image.filename
-            ):
-                booklet_success += 1
-            
-            time.sleep(self.config.download_delay)
+        with registry.timer('scrape_seconds', page='song'):
+            song_name, download_urls = retry_policy.call(
+                self._scrape_song_page, track.song_page_url, description=f"song page {track.song_page_url}"
+            )
+        if self.journal and download_urls:
+            self.journal.record_song_page(album_url, track.song_page_url, self.config.audio_format, song_name, download_urls)
+        return song_name, download_urls
+    
+    def _resolve_wanted(self, album_url: str, track: TrackInfo, fresh: bool, formats: List[str],
+                        retry_policy: RetryPolicy) -> Tuple[str, List[str], List[str]]:
+        """Song name, every download URL of a track and the URLs the format policy picks from them"""
+        song_name, download_urls = self._resolve_track(album_url, track, fresh, retry_policy)
+        return song_name, download_urls, self._select_urls(track, download_urls, formats)
+    
+    def _resolve_ahead(self, album_url: str, tracks: Iterable[TrackInfo], skipped_tracks: Set[str],
+                       changed_urls: Set[str], wanted: Dict[str, List[str]],
+                       retry_policy: RetryPolicy) -> Iterator[Tuple[TrackInfo, Optional[Future]]]:
+        """Pair each track with the resolution of its song page (None for skipped tracks).
+        Pages are submitted in track order but only a few per page worker ahead of the
+        consumer, so a songlist of thousands of rows doesn't queue every page at once."""
+        window = deque()
+        ahead = self.config.page_workers * 4
+        for track in tracks:
+            if self.stopping.is_set():
+                return
+            resolution = None
+            if track.song_page_url not in skipped_tracks:
+                resolution = self.resolve_executor.submit(
+                    self._resolve_wanted, album_url, track, track.song_page_url in changed_urls,
+                    wanted[track.song_page_url], retry_policy
+                )
+            window.append((track, resolution))
+            if len(window) > ahead:
+                yield window.popleft()
+        while window:
+            yield window.popleft()
+    
+    def _scrape_song_page(self, song_page_url: str) -> Tuple[str, List[str]]:
+        song_name, download_urls = self.scraper.get_download_urls(song_page_url)
+        if not download_urls:
+            # Usually a page that didn't load properly, so worth another try
+            raise ParseError("no download URLs found on song page")
+        return song_name, download_urls
+    
+    def _audio_formats(self) -> List[str]:
+        return ['mp3', 'flac'] if self.config.audio_format == 'both' else [self.config.audio_format]
+    
+    def _completion_format(self) -> str:
+        """Format an album is recorded complete in; a policy that fetches fewer files gets its own"""
+        if self.config.format_policy == 'all':
+            return self.config.audio_format
+        return f"{self.config.audio_format}/{self.config.format_policy}"
+    
+    def _plan_formats(self, album_info: AlbumInfo) -> Dict[str, List[str]]:
+        """Formats to fetch of each track, by song page URL, as far as the album page tells.
+        
+        The songlist's MP3 and FLAC columns give each file's size, so a track missing
+        a format is known before its song page is loaded, and prefer-flac and smallest
+        can pick a format up front. An empty list means none of the wanted formats is offered."""
+        formats = self._audio_formats()
+        # A format without a size column could still be on the song page
+        listed = [file_format for file_format in formats
+                  if any(track.size_of(file_format) for track in album_info.tracks)]
+        plan = {}
+        for track in album_info.tracks:
+            offered = [file_format for file_format in formats
+                       if file_format not in listed or track.size_of(file_format)]
+            if len(offered) > 1 and all(track.size_of(file_format) for file_format in offered):
+                if self.config.format_policy == 'smallest':
+                    offered = [min(offered, key=track.size_of)]
+                elif self.config.format_policy == 'prefer-flac':
+                    offered = ['flac']
+            plan[track.song_page_url] = offered
+        return plan
+    
+    def _select_urls(self, track: TrackInfo, download_urls: List[str], formats: List[str]) -> List[str]:
+        """Download URLs of the planned formats, narrowed to one if the plan left a choice
+        the policy has to make now: a HEAD request tells sizes the album page didn't."""
+        get_format = self.file_downloader.get_file_format
+        urls = [url for url in download_urls if get_format(url) in formats] or download_urls
+        if len(urls) < 2:
+            return urls
+        if self.config.format_policy == 'prefer-flac':
+            return [url for url in urls if get_format(url) == 'flac'] or urls
+        if self.config.format_policy == 'smallest':
+            sizes = {url: track.size_of(get_format(url)) or self.file_downloader.probe_size(url) for url in urls}
+            known = [url for url in urls if sizes[url]]
+            if known:
+                return [min(known, key=sizes.get)]
+        return urls
+    
+    def _get_skipped_tracks(self, album_url: str, album_info: AlbumInfo, diff: Optional[AlbumDiff],
+                            wanted: Dict[str, List[str]]) -> Dict[str, int]:
+        """Song page URLs of tracks that need no work, mapped to how many of their files the library holds.
+        
+        A track is skipped when the library holds what the format policy wants of it (every
+        planned format, one of them, or with skip-owned any format at all) or, in sync mode,
+        when it is unchanged in an album that was complete at the last sync."""
+        if not self.library:
+            return {}
+        policy = self.config.format_policy
+        refetch = set()
+        album_complete = False
+        if diff and diff.has_baseline:
+            refetch = diff.added_urls | diff.changed_urls
+            album_complete = self.library.get_complete_album(album_url, self._completion_format()) is not None
         
-        print(f"Downloaded {booklet_success}/{len(album_info.booklet_images)} booklet images")
+        skipped = {}
+        for track in album_info.tracks:
+            formats = wanted[track.song_page_url]
+            if track.song_page_url in refetch or not formats:
+                continue
+            owned_formats = self._audio_formats() if policy == 'skip-owned' else formats
+            owned = sum(self.library.has_track(album_url, track.song_page_url, file_format) for file_format in owned_formats)
+            if owned >= (len(formats) if policy == 'all' else 1) or album_complete:
+                skipped[track.song_page_url] = owned
+        return skipped
     
-    def _download_tracks(self, album_info: AlbumInfo):
+    def _record_owned(self, album_url: str, album_name: str, track: TrackInfo, url: str, total_cds: int):
+        """Record a track file as owned as soon as it is on disk, so an album cut off part
+        way still counts what it got on the next run"""
+        if not self.library:
+            return
+        filepath = self.file_downloader.get_track_filepath(url, album_name, track, total_cds)
+        try:
+            size = filepath.stat().st_size
+        except OSError:
+            return
+        recorded = self.content_index.get_file(filepath) if self.content_index else None
+        self.library.record_track(
+            album_url, track.song_page_url, self.file_downloader.get_file_format(url),
+            filepath, size, recorded[1] if recorded else None
+        )
+    
+    def _remember_fresh_file(self, url: str, filepath: Path, size: int, sha256: str):
+        # Only tracks, which _queue_post_processing takes out again, so the set can't grow for good
+        if self.file_downloader.get_file_format(url):
+            self.fresh_files.add(str(filepath))
+    
+    def _download_track_job(self, album_url: str, url: str, album_info: AlbumInfo, track: TrackInfo, total_cds: int,
+                            replace_existing: bool, derive_mp3: bool, retry_policy: RetryPolicy) -> Tuple[bool, Optional[Future]]:
+        """Runs on a download worker: transfer the file, then hand it to the process pool
+        without waiting, so the worker moves on to the next transfer"""
+        success = self.file_downloader.download_track(
+            url, album_info.name, track, total_cds, replace_existing, retry_policy
+        )
+        if not success:
+            return False, None
+        self._record_owned(album_url, album_info.name, track, url, total_cds)
+        return True, self._queue_post_processing(url, album_info, track, total_cds, derive_mp3)
+    
+    def _queue_post_processing(self, url: str, album_info: AlbumInfo, track: TrackInfo, total_cds: int,
+                               derive_mp3: bool) -> Optional[Future]:
+        if not (self.post_processor and self.post_processor.enabled):
+            return None
+        filepath = self.file_downloader.get_track_filepath(url, album_info.name, track, total_cds)
+        if str(filepath) not in self.fresh_files:
+            return None  # Already on disk before this run
+        self.fresh_files.discard(str(filepath))
+        
+        mp3_path = None
+        if derive_mp3 and self.post_processor.transcode and self.file_downloader.get_file_format(url) == 'flac':
+            mp3_path = self.file_downloader.get_format_filepath(album_info.name, track, 'mp3', total_cds)
+            if mp3_path.exists():
+                mp3_path = None
+        tags = None
+        if self.post_processor.tag:
+            tags = build_tags(album_info.name, track, len(album_info.get_tracks_by_cd()[track.cd_number]), total_cds)
+        if not (tags or mp3_path):
+            return None
+        return self.post_processor.submit(filepath, tags, mp3_path)
+    
+    def _finish_post_processing(self, post: Future, album_url: str, track: TrackInfo, url: str):
+        """Record the new size and hash of a tagged file, and the MP3 derived from it"""
+        try:
+            written = post.result()
+        except Exception as e:
+            print(f"Post-processing failed for {track.title}: {e}")
+            return
+        if 'tagged' in written:
+            path, size, sha256 = written['tagged']
+            if self.content_index:
+                self.content_index.record_file(url, Path(path), size, sha256)
+            if self.library:
+                self.library.record_track(
+                    album_url, track.song_page_url, self.file_downloader.get_file_format(url), Path(path), size, sha256
+                )
+        if 'transcoded' in written:
+            path, size, sha256 = written['transcoded']
+            print(f"Derived MP3: {Path(path).name}")
+            if self.library:
+                self.library.record_track(album_url, track.song_page_url, 'mp3', Path(path), size, sha256)
+    
+    def _needs_derived_mp3(self, download_urls: List[str]) -> bool:
+        """Whether an MP3 should be transcoded for a track offered only as FLAC"""
+        return (
+            self.config.transcode_mp3 and self.config.audio_format == 'both'
+            and not any(self.file_downloader.get_file_format(url) == 'mp3' for url in download_urls)
+        )
+    
+    def _track_label(self, track: TrackInfo, total_cds: int) -> str:
+        if total_cds > 1:
+            return f"CD{track.cd_number}-{track.track_number:02d}. {track.title}"
+        return f"{track.track_number:02d}. {track.title}"
+    
+    def _finish_album(self, result: AlbumResult, album_info: AlbumInfo):
+        complete = (
+            not result.failed_items
+            and result.successful_files == result.total_files
+            and result.successful_booklets == result.total_booklets
+            and result.processed_tracks == result.total_tracks
+        )
+        if self.journal and complete:
+            self.journal.finish_album(result.url)
+        if self.library and complete:
+            self.library.mark_album_complete(result.url, result.name, self._completion_format(), result.total_files)
+            # Baseline for the next sync
+            self.library.save_snapshot(result.url, album_info)
+    
+    def _album_priority(self, album_info: AlbumInfo) -> int:
+        """Scheduling priority of an album's transfers; lower values go first"""
+        return len(album_info.tracks) if self.config.album_priority == "smallest" else 0
+    
+    def _queue_booklet_images(self, album_info: AlbumInfo, result: AlbumResult, retry_policy: RetryPolicy) -> List[Future]:
+        print(f"\n=== Queuing {len(album_info.booklet_images)} Booklet Images ===")
+        priority = self._album_priority(album_info)
+        registry.inc('files_queued_total', len(album_info.booklet_images))
+        return [
+            self.download_scheduler.submit(
+                result.url, priority, self.file_downloader.download_booklet_image,
+                image.url, album_info.name, image.filename, retry_policy
+            )
+            for image in album_info.booklet_images
+        ]
+    
+    def _record_booklet_results(self, album_info: AlbumInfo, result: AlbumResult, results: List[bool]):
+        for image, success in zip(album_info.booklet_images, results):
+            if not success:
+                result.failed_items.append(f"Booklet {image.filename}: {self.file_downloader.pop_failure(image.url)}")
+        print(f"Downloaded {sum(results)}/{len(album_info.booklet_images)} booklet images")
+        result.total_booklets = len(results)
+        result.successful_booklets = sum(results)
+    
+    def _download_tracks(self, album_info: AlbumInfo, result: AlbumResult, diff: Optional[AlbumDiff],
+                         retry_policy: RetryPolicy):
         print("\n=== Downloading Music Tracks ===")
         
         # Group tracks by CD
@@ -69,57 +606,354 @@ class VideoGameMusicDownloader:
         total_cds = len(cd_tracks)
         
         total_tracks = len(album_info.tracks)
-        successful_downloads = 0
-        total_files = 0
         current_track = 0
+        current_cd = None
+        futures = []
+        completed_files = self.journal.get_completed_files(result.url) if self.journal else set()
+        journal_files = 0
+        wanted = self._plan_formats(album_info)
+        unoffered = {url for url, formats in wanted.items() if not formats}
+        skipped_tracks = self._get_skipped_tracks(result.url, album_info, diff, wanted)
+        changed_urls = diff.changed_urls if diff else set()
+        priority = self._album_priority(album_info)
+        
+        # Song pages are resolved in parallel and consumed in track order while the
+        # pool downloads; the semaphore bounds how far queuing can run ahead of the workers
+        pending = threading.BoundedSemaphore(self.config.download_workers * 2)
         
         if total_cds > 1:
             print(f"Album has {total_cds} CDs")
         else:
             print("Single CD album")
         
-        for cd_number in sorted(cd_tracks.keys()):
-            tracks = cd_tracks[cd_number]
+        ordered_tracks = itertools.chain.from_iterable(cd_tracks[cd_number] for cd_number in sorted(cd_tracks))
+        resolutions = self._resolve_ahead(
+            result.url, ordered_tracks, skipped_tracks.keys() | unoffered, changed_urls, wanted, retry_policy
+        )
+        for track, resolution in resolutions:
+            if self.stopping.is_set():
+                break
+            current_track += 1
+            if track.cd_number != current_cd:
+                current_cd = track.cd_number
+                if total_cds > 1:
+                    print(f"\n--- Processing CD {current_cd} ({len(cd_tracks[current_cd])} tracks) ---")
+                else:
+                    print(f"\n--- Processing {len(cd_tracks[current_cd])} tracks ---")
+            if resolution is None:
+                continue
             
             if total_cds > 1:
-                print(f"\n--- Processing CD {cd_number} ({len(tracks)} tracks) ---")
+                print(f"\nProcessing track {current_track}/{total_tracks}: CD{track.cd_number}-{track.track_number:02d}. {track.title}")
             else:
-                print(f"\n--- Processing {len(tracks)} tracks ---")
+                print(f"\nProcessing track {current_track}/{total_tracks}: {track.track_number:02d}. {track.title}")
             
-            for track in tracks:
-                current_track += 1
+            try:
+                # Get download URLs for this track
+                song_name, download_urls, selected_urls = resolution.result()
                 
-                if total_cds > 1:
-                    print(f"\nProcessing track {current_track}/{total_tracks}: CD{track.cd_number}-{track.track_number:02d}. {track.title}")
-                else:
-                    print(f"\nProcessing track {current_track}/{total_tracks}: {track.track_number:02d}. {track.title}")
-                
-                try:
-                    # Get download URLs for this track
-                    song_name, download_urls = self.scraper.get_download_urls(track.song_page_url)
-                    
-                    if not download_urls:
-                        print("No download URLs found for this track")
+                # Queue each selected format (MP3/FLAC) for the download workers
+                derive_mp3 = self._needs_derived_mp3(download_urls)
+                for url in selected_urls:
+                    if url in completed_files:
+                        journal_files += 1
+                        self._record_owned(result.url, album_info.name, track, url, total_cds)
                         continue
-                    
-                    # Download each format (MP3/FLAC)
-                    for url in download_urls:
-                        total_files += 1
-                        if self.file_downloader.download_track(url, album_info.name, track, total_cds):
-                            successful_downloads += 1
-                        
-                        time.sleep(self.config.download_delay)
-                    
-                    time.sleep(self.config.page_delay)
-                    
-                except Exception as e:
-                    print(f"Error processing track {current_track}: {e}")
-                    continue
+                    pending.acquire()
+                    if self.stopping.is_set():
+                        pending.release()
+                        break
+                    registry.inc('files_queued_total')
+                    future = self.download_scheduler.submit(
+                        result.url, priority, self._download_track_job,
+                        result.url, url, album_info, track, total_cds, track.song_page_url in changed_urls, derive_mp3,
+                        retry_policy
+                    )
+                    future.add_done_callback(lambda _: pending.release())
+                    futures.append((future, track, url))
+                
+            except CancelledError:
+                break  # Song page dropped by a stop
+            except Exception as e:
+                print(f"Error processing track {current_track}: {e}")
+                result.failed_items.append(f"{self._track_label(track, total_cds)}: {e}")
+                continue
+        
+        library_files = sum(skipped_tracks.values())
+        total_files = len(futures) + journal_files + library_files
+        successful_downloads = journal_files + library_files
+        for future, track, url in futures:
+            try:
+                success, post = future.result()
+            except CancelledError:
+                continue  # Dropped by a stop, to be fetched by the next run
+            if post:
+                self._finish_post_processing(post, result.url, track, url)
+            if success:
+                successful_downloads += 1
+            else:
+                result.failed_items.append(
+                    f"{self._track_label(track, total_cds)} ({url}): {self.file_downloader.pop_failure(url)}"
+                )
+        if journal_files:
+            print(f"Skipped {journal_files} files already completed according to the journal")
+        if skipped_tracks:
+            print(f"Skipped {len(skipped_tracks)} tracks already in the library")
+        if unoffered:
+            print(f"Skipped {len(unoffered)} tracks the album page lists in no wanted format")
+        
+        result.successful_files = successful_downloads
+        result.total_files = total_files
+        result.processed_tracks = current_track
         
         print(f"\n=== Download Summary ===")
         print(f"Successfully downloaded: {successful_downloads}/{total_files} files")
         print(f"Processed: {current_track}/{total_tracks} tracks")
+        self._print_failures(result)
+        self._print_rates()
+    
+    async def _download_albums_async(self, album_urls: List[str]) -> List[AlbumResult]:
+        """Drive every album, booklet images and tracks alike, from a single event loop"""
+        album_slots = asyncio.Semaphore(self.config.album_workers)
+        self.transfer_slots = AsyncFairSlots(self.config.async_transfers)
+        
+        async def run(album_url):
+            async with album_slots:
+                return await self._download_album_safely_async(album_url)
+        
+        async with self.file_downloader:
+            return await asyncio.gather(*(run(album_url) for album_url in album_urls))
+    
+    async def _download_album_safely_async(self, album_url: str, retry_policy: Optional[RetryPolicy] = None) -> AlbumResult:
+        try:
+            return await self._download_album_content_async(album_url, retry_policy or self.retry_policy)
+        except Exception as e:
+            print(f"Error downloading album {album_url}: {e}")
+            return AlbumResult(url=album_url, error=str(e))
+    
+    async def _download_album_content_async(self, album_url: str, retry_policy: RetryPolicy) -> AlbumResult:
+        complete = None if self.config.sync else self._get_complete_album(album_url)
+        if complete:
+            return complete
+        
+        loop = asyncio.get_running_loop()
+        album_info = await loop.run_in_executor(None, self._get_album_info, album_url, retry_policy)
+        result = AlbumResult(url=album_url, name=album_info.name, total_tracks=len(album_info.tracks))
+        diff = self._diff_album(album_info, result)
+        
+        booklet_task = None
+        if self.config.download_booklet and album_info.booklet_images:
+            booklet_task = asyncio.create_task(self._download_booklet_images_async(album_info, result, retry_policy))
+        
+        if album_info.tracks:
+            await self._download_tracks_async(album_info, result, diff, retry_policy)
+        else:
+            print("No tracks found!")
+        
+        if booklet_task:
+            await booklet_task
+        
+        self._finish_album(result, album_info)
+        return result
+    
+    async def _download_booklet_images_async(self, album_info: AlbumInfo, result: AlbumResult, retry_policy: RetryPolicy):
+        priority = self._album_priority(album_info)
+        
+        async def download(image):
+            async with self.transfer_slots.slot(result.url, priority):
+                return await self.file_downloader.download_booklet_image(
+                    image.url, album_info.name, image.filename, retry_policy
+                )
+        
+        registry.inc('files_queued_total', len(album_info.booklet_images))
+        results = await asyncio.gather(*(download(image) for image in album_info.booklet_images))
+        self._record_booklet_results(album_info, result, results)
+    
+    async def _download_tracks_async(self, album_info: AlbumInfo, result: AlbumResult, diff: Optional[AlbumDiff],
+                                     retry_policy: RetryPolicy):
+        print("\n=== Downloading Music Tracks ===")
+        
+        total_cds = album_info.cd_count
+        total_tracks = len(album_info.tracks)
+        tasks = []
+        completed_files = self.journal.get_completed_files(result.url) if self.journal else set()
+        journal_files = 0
+        wanted = self._plan_formats(album_info)
+        unoffered = {url for url, formats in wanted.items() if not formats}
+        skipped_tracks = self._get_skipped_tracks(result.url, album_info, diff, wanted)
+        changed_urls = diff.changed_urls if diff else set()
+        priority = self._album_priority(album_info)
+        # Bound how far URL resolution may run ahead of the transfers
+        pending = asyncio.Semaphore(self.config.async_transfers * 2)
+        # SQLite writes and stat calls go to the default executor, off the event loop
+        loop = asyncio.get_running_loop()
+        
+        async def download(url, track, derive_mp3):
+            try:
+                async with self.transfer_slots.slot(result.url, priority):
+                    success = await self.file_downloader.download_track(
+                        url, album_info.name, track, total_cds, track.song_page_url in changed_urls, retry_policy
+                    )
+            finally:
+                pending.release()
+            if not success:
+                return False
+            await loop.run_in_executor(None, self._record_owned, result.url, album_info.name, track, url, total_cds)
+            post = self._queue_post_processing(url, album_info, track, total_cds, derive_mp3)
+            if post:
+                await asyncio.wait([asyncio.wrap_future(post)])
+                await loop.run_in_executor(None, self._finish_post_processing, post, result.url, track, url)
+            return True
+        
+        # The scraper is blocking, so song pages are resolved off the event loop
+        resolutions = self._resolve_ahead(
+            result.url, album_info.tracks, skipped_tracks.keys() | unoffered, changed_urls, wanted, retry_policy
+        )
+        for current_track, (track, resolution) in enumerate(resolutions, 1):
+            if resolution is None:
+                continue
+            if total_cds > 1:
+                print(f"\nProcessing track {current_track}/{total_tracks}: CD{track.cd_number}-{track.track_number:02d}. {track.title}")
+            else:
+                print(f"\nProcessing track {current_track}/{total_tracks}: {track.track_number:02d}. {track.title}")
+            
+            try:
+                song_name, download_urls, selected_urls = await asyncio.wrap_future(resolution)
+            except Exception as e:
+                print(f"Error processing track {current_track}: {e}")
+                result.failed_items.append(f"{self._track_label(track, total_cds)}: {e}")
+                continue
+            
+            derive_mp3 = self._needs_derived_mp3(download_urls)
+            for url in selected_urls:
+                if url in completed_files:
+                    journal_files += 1
+                    await loop.run_in_executor(None, self._record_owned, result.url, album_info.name, track, url, total_cds)
+                    continue
+                await pending.acquire()
+                registry.inc('files_queued_total')
+                tasks.append((asyncio.create_task(download(url, track, derive_mp3)), track, url))
+        
+        results = await asyncio.gather(*(task for task, _, _ in tasks))
+        for (task, track, url), success in zip(tasks, results):
+            if not success:
+                result.failed_items.append(
+                    f"{self._track_label(track, total_cds)} ({url}): {self.file_downloader.pop_failure(url)}"
+                )
+        library_files = sum(skipped_tracks.values())
+        result.successful_files = sum(results) + journal_files + library_files
+        result.total_files = len(results) + journal_files + library_files
+        result.processed_tracks = total_tracks
+        if journal_files:
+            print(f"Skipped {journal_files} files already completed according to the journal")
+        if skipped_tracks:
+            print(f"Skipped {len(skipped_tracks)} tracks already in the library")
+        if unoffered:
+            print(f"Skipped {len(unoffered)} tracks the album page lists in no wanted format")
+        
+        print(f"\n=== Download Summary ===")
+        print(f"Successfully downloaded: {result.successful_files}/{result.total_files} files")
+        print(f"Processed: {total_tracks}/{total_tracks} tracks")
+        self._print_failures(result)
+        self._print_rates()
+    
+    def _print_failures(self, result: AlbumResult):
+        if result.failed_items:
+            print(f"Failed permanently ({len(result.failed_items)}):")
+            for item in result.failed_items:
+                print(f"  {item}")
+    
+    def _print_rates(self):
+        for rate_limiter in (self.page_rate_limiter, self.file_downloader.rate_limiter):
+            if rate_limiter.get_rates():
+                print(rate_limiter.describe())
+        if self.browser_scraper and self.browser_scraper.ready_histogram.count:
+            print(self.browser_scraper.ready_histogram.describe())
+    
+    def _time_totals(self) -> Dict[str, float]:
+        """Registry totals a run's breakdown is measured against; a service's registry spans many runs"""
+        return {
+            'scraping': sum(histogram.sum for histogram in registry.histograms('scrape_seconds')),
+            'transferring': sum(histogram.sum for histogram in registry.histograms('transfer_seconds')),
+            'downloaded': registry.get('bytes_downloaded_total'),
+            'rate-limit': registry.get('sleep_seconds_total', reason='rate-limit'),
+            'retry': registry.get('sleep_seconds_total', reason='retry'),
+        }
+    
+    def _print_time_breakdown(self, elapsed: float, baseline: Dict[str, float]):
+        """Where the run's time went; worker times are summed, so they can exceed the wall time"""
+        totals = {name: value - baseline[name] for name, value in self._time_totals().items()}
+        downloaded = totals['downloaded']
+        print(f"\n=== Time Breakdown ===")
+        print(f"Wall time: {elapsed:.1f}s, {downloaded / (1024 * 1024):.1f} MB at "
+              f"{downloaded / (1024 * 1024) / elapsed if elapsed > 0 else 0:.2f} MB/s")
+        print(f"Scraping pages: {totals['scraping']:.1f}s, transferring files: {totals['transferring']:.1f}s (summed over workers)")
+        print(f"Waiting on rate limits: {totals['rate-limit']:.1f}s, retry backoff: {totals['retry']:.1f}s")
+        for histogram in registry.histograms('request_latency_seconds'):
+            print(histogram.describe())
+    
+    def _print_batch_summary(self, results: List[AlbumResult]):
+        completed = [result for result in results if not result.error]
+        print(f"\n=== Batch Summary ===")
+        print(f"Albums completed: {len(completed)}/{len(results)}")
+        skipped = sum(1 for result in results if result.skipped)
+        if skipped:
+            print(f"Already complete before this run: {skipped}")
+        changed = [result for result in results if result.changes]
+        if self.config.sync:
+            print(f"Albums changed since the last sync: {len(changed)}")
+            for result in changed:
+                print(f"  {result.name}: {len(result.changes)} change(s)")
+        print(f"Files downloaded: {sum(r.successful_files for r in results)}/{sum(r.total_files for r in results)}")
+        print(f"Booklet images downloaded: {sum(r.successful_booklets for r in results)}/{sum(r.total_booklets for r in results)}")
+        
+        for result in results:
+            if result.error:
+                print(f"Failed: {result.url}: {result.error}")
+            elif result.failed_items:
+                print(f"Incomplete: {result.name} ({result.successful_files}/{result.total_files} files)")
+                for item in result.failed_items:
+                    print(f"  {item}")
+        
+        if self.retry_policy.retries_used:
+            print(f"Retries used: {self.retry_policy.retries_used}/{self.retry_policy.retry_budget}")
     
     def _cleanup(self):
+        if self.progress:
+            self.progress.stop()
+            self.progress = None
+        registry.close_log()
+        # After a stop only the running work is waited for, not the queue
+        if self.download_scheduler:
+            self.download_scheduler.shutdown(wait=True, cancel=self.stopping.is_set())
+            self.download_scheduler = None
+        if self.resolve_executor:
+            self.resolve_executor.shutdown(wait=True, cancel_futures=self.stopping.is_set())
+            self.resolve_executor = None
+        if self.post_processor:
+            if self.post_processor.enabled:
+                self.file_downloader.completion_listeners.remove(self._remember_fresh_file)
+            self.post_processor.close()
+            self.post_processor = None
+            self.fresh_files.clear()
+        if self.browser_pool:
+            self.browser_pool.close()
+            self.browser_pool = None
+            self.browser_scraper = None
         if self.browser_manager:
-            self.browser_manager.quit()
\ No newline at end of file
+            self.browser_manager.quit()
+        if self.metadata_cache:
+            self.metadata_cache.close()
+            self.metadata_cache = None
+        if self.journal:
+            self.file_downloader.completion_listeners.remove(self.journal.record_file)
+            self.journal.close()
+            self.journal = None
+        if self.library:
+            self.library.close()
+            self.library = None
+        if self.content_index:
+            self.file_downloader.completion_listeners.remove(self.content_index.record_file)
+            self.file_downloader.content_index = None
+            self.content_index.close()
+            self.content_index = None
\ No newline at end of file
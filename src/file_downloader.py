@@ -1,81 +1,443 @@
 import os
 import re
+import json
+import hashlib
+import shutil
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Dict, List, Tuple, Set, Callable
 from .config import Config
 from .models import TrackInfo
+from .host_limiter import HostLimiter
+from .rate_limiter import AdaptiveRateLimiter, BandwidthLimiter
+from .retry import RetryPolicy, RetryError, RunStopped, classify_error
+from .metrics import registry
+
+class IncompleteDownloadError(IOError):
+    """The transfer ended before the size announced by the server was reached"""
 
 class FileDownloader:
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, retry_policy: Optional[RetryPolicy] = None):
         self.config = config
+        self.retry_policy = retry_policy or RetryPolicy.from_config(config)
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': config.user_agent
         })
+        # Size the connection pool so parallel workers don't discard connections
+        pool_size = max(10, config.download_workers * 2)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.host_limiter = HostLimiter(config.max_connections_per_host)
+        self.rate_limiter = AdaptiveRateLimiter.from_delay(config.download_delay, config, name="Download")
+        # Shared by every transfer, so the cap holds for the run as a whole
+        self.bandwidth_limiter = BandwidthLimiter(config.max_bandwidth_mb * 1024 * 1024) if config.max_bandwidth_mb > 0 else None
+        # Called as listener(url, filepath, size, sha256) after each completed transfer
+        self.completion_listeners: List[Callable[[str, Path, int, str], None]] = []
+        # Why each URL that failed for good did so
+        self.failures: Dict[str, str] = {}
+        # Optional ContentIndex used to reuse and deduplicate files already on disk
+        self.content_index = None
+        # Set to end running transfers early, keeping their .part files for the next run
+        self.stopping = threading.Event()
     
-    def download_track(self, url: str, album_name: str, track_info: TrackInfo, total_cds: int = 1) -> bool:
+    def download_track(self, url: str, album_name: str, track_info: TrackInfo, total_cds: int = 1,
+                     replace_existing: bool = False, retry_policy: Optional[RetryPolicy] = None) -> bool:
         try:
-            # Determine file format from URL
-            file_format = self._get_file_format(url)
-            if not file_format:
+            # The target path depends on the format in the URL
+            filepath = self.get_track_filepath(url, album_name, track_info, total_cds)
+            if not filepath:
                 print(f"Unknown file format for URL: {url}")
                 return False
             
-            filename = track_info.get_formatted_filename(file_format)
-            filepath = self._get_track_filepath(album_name, track_info.cd_number, file_format, filename, total_cds)
+            filename = filepath.name
             
-            if filepath.exists():
+            # A corrected track replaces the old file once the new one is complete
+            if not replace_existing and self._is_present(url, filepath):
                 print(f"Track already exists: {filename}")
+                self._record_success(url)
                 return True
             
-            response = self.session.get(url, stream=True)
-            response.raise_for_status()
-            
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            with registry.timer('transfer_seconds', host=urlparse(url).netloc):
+                (retry_policy or self.retry_policy).call(self._stream_to_file, url, filepath, description=filename)
             
             file_size = filepath.stat().st_size / (1024 * 1024)
             print(f"Downloaded track: {filename} ({file_size:.2f} MB)")
+            self._record_success(url)
             return True
             
         except Exception as e:
             print(f"Error downloading track {url}: {e}")
+            self._record_failure(url, e)
             return False
     
-    def download_booklet_image(self, url: str, album_name: str, filename: str) -> bool:
+    def download_booklet_image(self, url: str, album_name: str, filename: str,
+                               retry_policy: Optional[RetryPolicy] = None) -> bool:
         try:
             safe_filename = self._sanitize_filename(filename)
             filepath = self._get_booklet_filepath(album_name, safe_filename)
             
-            if filepath.exists():
+            if self._is_present(url, filepath):
                 print(f"Booklet image already exists: {safe_filename}")
+                self._record_success(url)
                 return True
             
-            response = self.session.get(url, stream=True)
-            response.raise_for_status()
-            
-            filepath.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            with registry.timer('transfer_seconds', host=urlparse(url).netloc):
+                (retry_policy or self.retry_policy).call(self._stream_to_file, url, filepath, description=safe_filename)
             
             file_size = filepath.stat().st_size / (1024 * 1024)
             print(f"Downloaded booklet: {safe_filename} ({file_size:.2f} MB)")
+            self._record_success(url)
             return True
             
         except Exception as e:
             print(f"Error downloading booklet image {url}: {e}")
+            self._record_failure(url, e)
             return False
     
-    def _get_file_format(self, url: str) -> Optional[str]:
+    def pop_failure(self, url: str) -> str:
+        """Why url failed. The reason is forgotten once reported, so a long-running
+        service neither accumulates reasons nor reports one from an earlier job."""
+        return self.failures.pop(url, "failed")
+    
+    def _record_success(self, url: str):
+        # Counted as each file finishes, so the progress bar moves during the run
+        registry.inc('files_completed_total')
+    
+    def _record_failure(self, url: str, error: Exception):
+        if isinstance(error, RetryError):
+            self.failures[url] = f"{error.kind} after {error.attempts} attempt(s): {error.error}"
+        else:
+            self.failures[url] = f"{classify_error(error)}: {error}"
+        registry.inc('files_failed_total')
+        registry.log('failed', url=url, reason=self.failures[url])
+    
+    def _stream_to_file(self, url: str, filepath: Path):
+        """
+        Download into 'filepath.part', resuming a previous partial download with a
+        Range request, and rename it into place once its size has been verified.
+        """
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        part_path = self._get_part_path(filepath)
+        
+        if self.config.download_segments > 1 and part_path.exists():
+            total_size = self._get_segment_state_size(self._get_segment_state_path(filepath))
+            if total_size:
+                self._download_segmented_file(url, filepath, total_size)
+                return
+        
+        offset = self._resume_offset(filepath)
+        digest = hashlib.sha256()
+        host = urlparse(url).netloc
+        segmented_size = None
+        
+        with self.host_limiter.slot(url):
+            response = self._request('GET', url, stream=True, headers=self._range_headers(offset))
+            with response:
+                if response.status_code == 416:
+                    # The partial file is already as long as the remote file
+                    expected_size = self._parse_total_size(response.headers.get('Content-Range'))
+                    if expected_size is None or expected_size != offset:
+                        part_path.unlink()
+                        raise IncompleteDownloadError(f"Discarded stale partial download of {filepath.name}")
+                    self._hash_file(part_path, digest)
+                else:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        # Server ignored the Range header, start over
+                        offset = 0
+                    expected_size = self._get_expected_size(response.status_code, response.headers, offset)
+                    if not offset and self._should_segment(response.status_code, response.headers, expected_size):
+                        # Large enough to split: this response is dropped unread in favour of parallel ranges
+                        segmented_size = expected_size
+                    else:
+                        if offset:
+                            self._hash_file(part_path, digest)
+                        
+                        # The hash is updated as chunks arrive, so the file is never read back
+                        with open(part_path, 'ab' if offset else 'wb') as f:
+                            for chunk in response.iter_content(chunk_size=65536):
+                                self._check_stopping(filepath)
+                                if chunk:
+                                    f.write(chunk)
+                                    digest.update(chunk)
+                                    registry.inc('bytes_downloaded_total', len(chunk), host=host)
+                                    if self.bandwidth_limiter:
+                                        self.bandwidth_limiter.consume(len(chunk))
+        
+        if segmented_size:
+            # Outside the host slot, since the segments take slots of their own
+            self._download_segmented_file(url, filepath, segmented_size)
+            return
+        self._finalize_part(part_path, filepath, expected_size)
+        self._notify_complete(url, filepath, digest)
+    
+    def _check_stopping(self, filepath: Path):
+        if self.stopping.is_set():
+            raise RunStopped(f"Stopped downloading {filepath.name}")
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request paced by the adaptive rate limiter and report how it went"""
+        self.rate_limiter.acquire(url)
+        response = self.session.request(method, url, timeout=self.config.request_timeout, **kwargs)
+        elapsed = response.elapsed.total_seconds()
+        registry.observe('request_latency_seconds', elapsed, host=urlparse(url).netloc)
+        self.rate_limiter.feedback(url, response.status_code, elapsed, response.headers.get('Retry-After'))
+        return response
+    
+    def _hash_file(self, path: Path, digest):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+    
+    def _is_present(self, url: str, filepath: Path) -> bool:
+        """Whether filepath already holds the file, linking in a copy downloaded elsewhere if there is one"""
+        if filepath.exists():
+            recorded = self.content_index.get_file(filepath) if self.content_index else None
+            if recorded is None or recorded[0] == filepath.stat().st_size:
+                return True
+            print(f"{filepath.name} doesn't match its recorded size, downloading it again")
+            filepath.unlink()
+            return False
+        
+        known = self.content_index.find_by_url(url, exclude=filepath) if self.content_index else None
+        if known and self._link_copy(known[0], filepath, allow_copy=True):
+            # Same URL as a file of another album (compilations, re-releases): no transfer needed
+            print(f"Reused {filepath.name} from {known[0]}")
+            self._notify_listeners(url, filepath, known[1], known[2])
+            return True
+        return False
+    
+    def _notify_complete(self, url: str, filepath: Path, digest):
+        size = filepath.stat().st_size
+        sha256 = digest.hexdigest()
+        if self.content_index and self.config.hardlink_duplicates:
+            original = self.content_index.find_by_content(size, sha256, exclude=filepath)
+            if original and self._link_copy(original, filepath):
+                print(f"{filepath.name} is identical to {original}, hardlinked it")
+        self._notify_listeners(url, filepath, size, sha256)
+    
+    def _link_copy(self, source: Path, target: Path, allow_copy: bool = False) -> bool:
+        """Replace target with a hardlink to source, or a copy if linking isn't possible and allowed"""
+        temp_path = target.with_name(target.name + '.link')
+        try:
+            if target.exists() and os.path.samefile(source, target):
+                return True
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if temp_path.exists():
+                temp_path.unlink()
+            linked = False
+            if self.config.hardlink_duplicates:
+                try:
+                    os.link(source, temp_path)
+                    linked = True
+                except OSError:
+                    pass  # Other filesystem, or no hardlink support
+            if not linked:
+                if not allow_copy:
+                    return False
+                shutil.copyfile(source, temp_path)
+            os.replace(temp_path, target)
+            return True
+        except OSError as e:
+            print(f"Could not link {target.name} to {source}: {e}")
+            return False
+    
+    def _notify_listeners(self, url: str, filepath: Path, size: int, sha256: str):
+        registry.log('file', url=url, path=str(filepath), size=size, sha256=sha256)
+        for listener in self.completion_listeners:
+            try:
+                listener(url, filepath, size, sha256)
+            except Exception as e:
+                print(f"Error recording download of {filepath.name}: {e}")
+    
+    def probe_size(self, url: str) -> Optional[int]:
+        """Size of the remote file according to a HEAD request, or None if it can't be told"""
+        try:
+            with self.host_limiter.slot(url):
+                response = self._request('HEAD', url, allow_redirects=True)
+        except requests.RequestException:
+            return None
+        if response.status_code != 200:
+            return None
+        return self._get_expected_size(200, response.headers, 0)
+    
+    def _should_segment(self, status_code: int, headers, total_size: Optional[int]) -> bool:
+        """Whether a full response is worth refetching as parallel byte ranges, judged from its headers"""
+        return (
+            self.config.download_segments > 1
+            and status_code == 200
+            and headers.get('Accept-Ranges') == 'bytes'
+            and total_size is not None
+            and total_size >= self.config.segment_threshold_mb * 1024 * 1024
+        )
+    
+    def _resume_offset(self, filepath: Path) -> int:
+        """Length of the partial download a single stream can resume from. A .part with a
+        .segments sidecar is preallocated and filled out of order, not a prefix, so it is dropped."""
+        part_path = self._get_part_path(filepath)
+        if self._get_segment_state_path(filepath).exists():
+            self._discard_partial(filepath)
+            return 0
+        return part_path.stat().st_size if part_path.exists() else 0
+    
+    def _discard_partial(self, filepath: Path):
+        # The .part goes first, so a crash in between can't leave a preallocated part without its sidecar
+        self._get_part_path(filepath).unlink(missing_ok=True)
+        self._get_segment_state_path(filepath).unlink(missing_ok=True)
+    
+    def _download_segmented_file(self, url: str, filepath: Path, total_size: int):
+        self._download_segmented(url, filepath, total_size)
+        # Segments arrive out of order, so hash the assembled file
+        digest = hashlib.sha256()
+        self._hash_file(filepath, digest)
+        self._notify_complete(url, filepath, digest)
+    
+    def _download_segmented(self, url: str, filepath: Path, total_size: int):
+        """
+        Fetch byte ranges of the file over parallel connections and write them in
+        place into a preallocated .part file. Finished segments are recorded next
+        to it so an interrupted download only refetches the missing ones.
+        """
+        part_path = self._get_part_path(filepath)
+        state_path = self._get_segment_state_path(filepath)
+        segments, done = self._load_segment_state(state_path, total_size)
+        
+        if not segments or not part_path.exists():
+            segments, done = self._split_segments(total_size), set()
+            self._save_segment_state(state_path, total_size, segments, done)
+            with open(part_path, 'wb') as f:
+                f.truncate(total_size)
+        
+        state_lock = threading.Lock()
+        host = urlparse(url).netloc
+        changed = threading.Event()
+        
+        def fetch(index: int):
+            start, end = segments[index]
+            written = 0
+            with self.host_limiter.slot(url):
+                response = self._request('GET', url, stream=True, headers={'Range': f'bytes={start}-{end}'})
+                with response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IncompleteDownloadError(f"Server ignored range request for {filepath.name}")
+                    if self._parse_total_size(response.headers.get('Content-Range')) not in (None, total_size):
+                        changed.set()
+                        raise IncompleteDownloadError(f"Remote size of {filepath.name} changed, starting over")
+                    # Each segment writes through its own handle at its own offset
+                    with open(part_path, 'r+b') as f:
+                        f.seek(start)
+                        for chunk in response.iter_content(chunk_size=65536):
+                            self._check_stopping(filepath)
+                            if chunk:
+                                f.write(chunk)
+                                written += len(chunk)
+                                registry.inc('bytes_downloaded_total', len(chunk), host=host)
+                                if self.bandwidth_limiter:
+                                    self.bandwidth_limiter.consume(len(chunk))
+            
+            if written != end - start + 1:
+                raise IncompleteDownloadError(
+                    f"Incomplete segment {index} of {filepath.name}: got {written} of {end - start + 1} bytes"
+                )
+            with state_lock:
+                done.add(index)
+                self._save_segment_state(state_path, total_size, segments, done)
+        
+        remaining = [index for index in range(len(segments)) if index not in done]
+        try:
+            with ThreadPoolExecutor(max_workers=self.config.download_segments) as executor:
+                for future in [executor.submit(fetch, index) for index in remaining]:
+                    future.result()
+        finally:
+            # Only once every segment's handle is closed
+            if changed.is_set():
+                self._discard_partial(filepath)
+        
+        self._finalize_part(part_path, filepath, total_size)
+        state_path.unlink()
+    
+    def _split_segments(self, total_size: int) -> List[Tuple[int, int]]:
+        segment_size = -(-total_size // self.config.download_segments)
+        return [
+            (start, min(start + segment_size, total_size) - 1)
+            for start in range(0, total_size, segment_size)
+        ]
+    
+    def _get_segment_state_path(self, filepath: Path) -> Path:
+        return filepath.with_name(filepath.name + '.segments')
+    
+    def _get_segment_state_size(self, state_path: Path) -> Optional[int]:
+        """Remote size recorded by an interrupted segmented download, if there is one"""
+        try:
+            return int(json.loads(state_path.read_text())['size'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _load_segment_state(self, state_path: Path, total_size: int) -> Tuple[List[Tuple[int, int]], Set[int]]:
+        try:
+            state = json.loads(state_path.read_text())
+            if state['size'] == total_size:
+                return [tuple(segment) for segment in state['segments']], set(state['done'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return [], set()
+    
+    def _save_segment_state(self, state_path: Path, total_size: int, segments: List[Tuple[int, int]], done: Set[int]):
+        temp_path = state_path.with_name(state_path.name + '.tmp')
+        temp_path.write_text(json.dumps({'size': total_size, 'segments': segments, 'done': sorted(done)}))
+        os.replace(temp_path, state_path)
+    
+    def _get_part_path(self, filepath: Path) -> Path:
+        return filepath.with_name(filepath.name + '.part')
+    
+    def _range_headers(self, offset: int) -> Dict[str, str]:
+        return {'Range': f'bytes={offset}-'} if offset else {}
+    
+    def _get_expected_size(self, status_code: int, headers, offset: int) -> Optional[int]:
+        """Total size of the remote file, if the server told us"""
+        if status_code == 206:
+            return self._parse_total_size(headers.get('Content-Range'))
+        # Content-Length describes the encoded body, which can't be compared to the file size
+        if headers.get('Content-Encoding', 'identity') != 'identity':
+            return None
+        content_length = headers.get('Content-Length')
+        return int(content_length) if content_length and content_length.isdigit() else None
+    
+    def _parse_total_size(self, content_range: Optional[str]) -> Optional[int]:
+        """Parse the total from 'bytes 100-199/200' or 'bytes */200'"""
+        if not content_range or '/' not in content_range:
+            return None
+        total = content_range.rsplit('/', 1)[1].strip()
+        return int(total) if total.isdigit() else None
+    
+    def _finalize_part(self, part_path: Path, filepath: Path, expected_size: Optional[int]):
+        actual_size = part_path.stat().st_size
+        if expected_size is not None and actual_size != expected_size:
+            # Keep the partial file so the next attempt can resume it
+            raise IncompleteDownloadError(
+                f"Incomplete download of {filepath.name}: got {actual_size} of {expected_size} bytes"
+            )
+        os.replace(part_path, filepath)
+    
+    def get_track_filepath(self, url: str, album_name: str, track_info: TrackInfo, total_cds: int = 1) -> Optional[Path]:
+        """Where the file downloaded from url is stored, or None if its format is unknown"""
+        file_format = self.get_file_format(url)
+        if not file_format:
+            return None
+        return self.get_format_filepath(album_name, track_info, file_format, total_cds)
+    
+    def get_format_filepath(self, album_name: str, track_info: TrackInfo, file_format: str, total_cds: int = 1) -> Path:
+        """Where the track is stored in file_format, e.g. for an MP3 derived from its FLAC"""
+        filename = track_info.get_formatted_filename(file_format)
+        return self._get_track_filepath(album_name, track_info.cd_number, file_format, filename, total_cds)
+    
+    def get_file_format(self, url: str) -> Optional[str]:
         """Extract file format from URL"""
         parsed_url = urlparse(url)
         filename = os.path.basename(parsed_url.path)
@@ -0,0 +1,24 @@
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from typing import Dict
+
+class HostLimiter:
+    """Cap the number of simultaneous connections opened to each host"""
+    
+    def __init__(self, max_per_host: int):
+        self.max_per_host = max(1, max_per_host)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+    
+    def _get_semaphore(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._semaphores[host]
+    
+    @contextmanager
+    def slot(self, url: str):
+        semaphore = self._get_semaphore(urlparse(url).netloc)
+        with semaphore:
+            yield
\ No newline at end of file
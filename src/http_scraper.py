@@ -0,0 +1,252 @@
+import re
+import requests
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import List, Tuple, Dict, Optional, Callable
+from .config import Config
+from .models import AlbumInfo, TrackInfo, BookletImage
+from .rate_limiter import AdaptiveRateLimiter
+from .page_parser import iter_tracks, parse_song_name, parse_download_urls, parse_booklet_images
+
+CHALLENGE_MARKERS = (
+    'cf-browser-verification',
+    'challenge-platform',
+    'cf_chl_',
+    '<title>just a moment',
+    'attention required! | cloudflare',
+)
+
+VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'param', 'source', 'track', 'wbr'
+}
+
+class ChallengeError(Exception):
+    """Raised when the site answers with a bot challenge instead of content"""
+
+class Node:
+    __slots__ = ('tag', 'attrs', 'children', 'parent')
+    
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional['Node'] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+    
+    def get(self, name: str) -> Optional[str]:
+        return self.attrs.get(name)
+    
+    def has_class(self, class_name: str) -> bool:
+        return class_name in (self.attrs.get('class') or '').split()
+    
+    def iter(self):
+        for child in self.children:
+            if isinstance(child, Node):
+                yield child
+                yield from child.iter()
+    
+    def find_all(self, tag: Optional[str] = None, id: Optional[str] = None, class_name: Optional[str] = None) -> List['Node']:
+        return [
+            node for node in self.iter()
+            if (tag is None or node.tag == tag)
+            and (id is None or node.get('id') == id)
+            and (class_name is None or node.has_class(class_name))
+        ]
+    
+    def find(self, tag: Optional[str] = None, id: Optional[str] = None, class_name: Optional[str] = None) -> Optional['Node']:
+        for node in self.iter():
+            if ((tag is None or node.tag == tag)
+                    and (id is None or node.get('id') == id)
+                    and (class_name is None or node.has_class(class_name))):
+                return node
+        return None
+    
+    @property
+    def text(self) -> str:
+        """Approximate the rendered text of the node, like WebElement.text"""
+        parts = []
+        self._collect_text(parts)
+        lines = [re.sub(r'\s+', ' ', line).strip() for line in ''.join(parts).split('\n')]
+        return '\n'.join(line for line in lines if line)
+    
+    def _collect_text(self, parts: List[str]):
+        for child in self.children:
+            if isinstance(child, Node):
+                if child.tag in ('script', 'style'):
+                    continue
+                if child.tag == 'br':
+                    parts.append('\n')
+                    continue
+                child._collect_text(parts)
+                if child.tag in ('p', 'div', 'tr', 'li', 'h1', 'h2', 'h3'):
+                    parts.append('\n')
+            else:
+                parts.append(child)
+
+class TreeBuilder(HTMLParser):
+    """Build a lightweight element tree with the stdlib HTML parser"""
+    
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node('document', {})
+        self.current = self.root
+    
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {name: value or '' for name, value in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+    
+    def handle_startendtag(self, tag, attrs):
+        node = Node(tag, {name: value or '' for name, value in attrs}, self.current)
+        self.current.children.append(node)
+    
+    def handle_endtag(self, tag):
+        # Close up to the matching open element, tolerating unclosed tags
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+    
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+def parse_html(html: str) -> Node:
+    builder = TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+class HTTPScraper:
+    """Scrape KHInsider pages over plain HTTP without driving a browser.
+    
+    ``fallback`` is called to obtain a browser based scraper when a page
+    answers with a bot challenge; from then on that scraper is used.
+    """
+    
+    def __init__(self, session: requests.Session, config: Config, fallback: Optional[Callable] = None,
+                 rate_limiter: Optional[AdaptiveRateLimiter] = None):
+        self.session = session
+        self.config = config
+        self.fallback = fallback
+        self.rate_limiter = rate_limiter
+        self.fallback_scraper = None
+    
+    def get_album_info(self, url: str) -> AlbumInfo:
+        if self.fallback_scraper:
+            return self.fallback_scraper.get_album_info(url)
+        
+        try:
+            document = self._fetch(url)
+        except ChallengeError as e:
+            return self._get_fallback(e).get_album_info(url)
+        
+        return AlbumInfo(
+            name=self._extract_album_name(document),
+            tracks=self._extract_tracks(document, url),
+            booklet_images=self._extract_booklet_images(document, url)
+        )
+    
+    def get_download_urls(self, song_page_url: str) -> Tuple[str, List[str]]:
+        if self.fallback_scraper:
+            return self.fallback_scraper.get_download_urls(song_page_url)
+        
+        try:
+            document = self._fetch(song_page_url)
+        except ChallengeError as e:
+            return self._get_fallback(e).get_download_urls(song_page_url)
+        
+        song_name = self._extract_song_name(document)
+        download_urls = self._extract_download_urls(document, song_page_url)
+        
+        return song_name, download_urls
+    
+    def _fetch(self, url: str) -> Node:
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        response = self.session.get(url, timeout=self.config.request_timeout)
+        if self.rate_limiter:
+            self.rate_limiter.feedback(
+                url, response.status_code, response.elapsed.total_seconds(), response.headers.get('Retry-After')
+            )
+        if self._is_challenge(response):
+            raise ChallengeError(f"Challenge page returned for {url} (HTTP {response.status_code})")
+        response.raise_for_status()
+        return parse_html(response.text)
+    
+    def _is_challenge(self, response: requests.Response) -> bool:
+        if response.headers.get('cf-mitigated') == 'challenge':
+            return True
+        if response.status_code not in (200, 403, 429, 503):
+            return False
+        head = response.text[:4096].lower()
+        return any(marker in head for marker in CHALLENGE_MARKERS)
+    
+    def _get_fallback(self, error: ChallengeError):
+        if not self.fallback:
+            raise error
+        print(f"{error}, falling back to browser")
+        self.fallback_scraper = self.fallback()
+        return self.fallback_scraper
+    
+    def _extract_album_name(self, document: Node) -> str:
+        title_element = document.find('h2')
+        if title_element:
+            return title_element.text.strip()
+        return "Unknown Album"
+    
+    def _extract_tracks(self, document: Node, base_url: str) -> List[TrackInfo]:
+        table = document.find(id='songlist')
+        if not table:
+            print("Error extracting tracks: songlist not found")
+            return []
+        
+        # Rows are converted one at a time as the parser asks for them
+        rows = (
+            [self._cell(cell, base_url) for cell in row.children if isinstance(cell, Node) and cell.tag == 'td']
+            for row in table.iter() if row.tag == 'tr'
+        )
+        return list(iter_tracks(rows, self._header(table)))
+    
+    def _cell(self, cell: Node, base_url: str) -> Dict[str, Optional[str]]:
+        link = cell.find('a')
+        href = link.get('href') if link else None
+        return {
+            'text': cell.text.strip(),
+            'link_text': link.text.strip() if link else None,
+            'href': urljoin(base_url, href) if href else None
+        }
+    
+    def _header(self, table: Node) -> List[Dict[str, Optional[str]]]:
+        header_row = table.find(id='songlist_header')
+        if not header_row:
+            return []
+        return [{'text': cell.text.strip(), 'colspan': cell.get('colspan')} for cell in header_row.find_all('th')]
+    
+    def _extract_song_name(self, document: Node) -> str:
+        return parse_song_name([p.text for p in document.find_all('p')])
+    
+    def _extract_download_urls(self, document: Node, base_url: str) -> List[str]:
+        song_download_links = []
+        for link_span in document.find_all(class_name='songDownloadLink'):
+            # The span sits inside the <a> that holds the download URL
+            href = link_span.parent.get('href') if link_span.parent is not None else None
+            song_download_links.append(urljoin(base_url, href) if href else None)
+        return parse_download_urls(song_download_links, self._links(document, base_url), self.config.audio_format)
+    
+    def _extract_booklet_images(self, document: Node, base_url: str) -> List[BookletImage]:
+        album_images = []
+        for div in document.find_all(class_name='albumImage'):
+            link = div.find('a')
+            img = div.find('img')
+            href = link.get('href') if link else None
+            album_images.append({
+                'href': urljoin(base_url, href) if href else None,
+                'src': img.get('src') if img else None
+            })
+        table_links = [link for table in document.find_all('table') for link in self._links(table, base_url)]
+        return parse_booklet_images(album_images, table_links)
+    
+    def _links(self, node: Node, base_url: str) -> List[str]:
+        return [urljoin(base_url, link.get('href')) for link in node.find_all('a') if link.get('href')]
@@ -0,0 +1,117 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from dataclasses import asdict
+from typing import Dict, List, Optional, Tuple
+from .models import AlbumResult
+
+class JobQueue:
+    """Persistent queue of album downloads submitted to the service.
+    
+    Each job moves from queued to running to done or failed. Jobs found
+    running when the queue is opened were cut off by a restart and go back
+    to queued; the journal lets them pick up where they stopped.
+    """
+    
+    STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+    
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, album_url TEXT NOT NULL, status TEXT NOT NULL, '
+                'submitted_at REAL NOT NULL, started_at REAL, finished_at REAL, result TEXT)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)')
+            self._conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+    
+    def add(self, album_url: str) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (album_url, status, submitted_at) VALUES (?, 'queued', ?)",
+                (album_url, time.time())
+            )
+            return cursor.lastrowid
+    
+    def claim(self, limit: int) -> List[Tuple[int, str]]:
+        """Mark up to limit of the oldest queued jobs running and return their (id, album URL)"""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                "SELECT id, album_url FROM jobs WHERE status = 'queued' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                [(time.time(), job_id) for job_id, _ in rows]
+            )
+        return rows
+    
+    def finish(self, job_id: int, result: AlbumResult):
+        status = 'failed' if result.error or result.failed_items else 'done'
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, result = ? WHERE id = ?',
+                (status, time.time(), json.dumps(asdict(result)), job_id)
+            )
+    
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that hasn't started; False if it has or doesn't exist"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount > 0
+    
+    def get(self, job_id: int) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT id, album_url, status, submitted_at, started_at, finished_at, result FROM jobs WHERE id = ?',
+                (job_id,)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def recent(self, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """Most recent jobs first, optionally only those with the given status"""
+        query = 'SELECT id, album_url, status, submitted_at, started_at, finished_at, result FROM jobs'
+        params = ()
+        if status:
+            query += ' WHERE status = ?'
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY id DESC LIMIT ?', params + (limit,)).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = dict.fromkeys(self.STATUSES, 0)
+        counts.update(rows)
+        return counts
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    @staticmethod
+    def _to_dict(row) -> Dict:
+        job_id, album_url, status, submitted_at, started_at, finished_at, result = row
+        job = {
+            'id': job_id,
+            'album_url': album_url,
+            'status': status,
+            'submitted_at': submitted_at,
+            'started_at': started_at,
+            'finished_at': finished_at,
+        }
+        if started_at:
+            job['elapsed'] = round((finished_at or time.time()) - started_at, 3)
+        if result:
+            job['result'] = json.loads(result)
+        return job
@@ -0,0 +1,113 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Tuple, Optional, Set
+from .models import AlbumInfo
+
+class DownloadJournal:
+    """Crash-safe record of in-progress album runs.
+    
+    For every unfinished album the journal keeps the scraped album metadata,
+    the resolved download URLs of each song page (per audio format, since a
+    run for one format doesn't find the other's) and the completion state of
+    each file (path, size and SHA-256), so a restarted run can go straight to
+    the remaining work. Rows of an album are dropped once it fully completes.
+    """
+    
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            # WAL with synchronous=NORMAL survives crashes without an fsync per commit
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS albums ('
+                'album_url TEXT PRIMARY KEY, data TEXT NOT NULL, started_at REAL NOT NULL)'
+            )
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(song_pages)')]
+            if columns and 'audio_format' not in columns:
+                # Written before entries were keyed by format; those pages are simply resolved again
+                self._conn.execute('DROP TABLE song_pages')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS song_pages ('
+                'song_page_url TEXT NOT NULL, audio_format TEXT NOT NULL, album_url TEXT NOT NULL, '
+                'song_name TEXT NOT NULL, urls TEXT NOT NULL, PRIMARY KEY (song_page_url, audio_format))'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                'url TEXT PRIMARY KEY, album_url TEXT NOT NULL, path TEXT, '
+                'size INTEGER, sha256 TEXT, completed_at REAL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS song_pages_album ON song_pages (album_url)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS files_album ON files (album_url)')
+    
+    def get_album(self, album_url: str) -> Optional[AlbumInfo]:
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM albums WHERE album_url = ?', (album_url,)).fetchone()
+        return AlbumInfo.from_dict(json.loads(row[0])) if row else None
+    
+    def record_album(self, album_url: str, album_info: AlbumInfo):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO albums (album_url, data, started_at) VALUES (?, ?, ?)',
+                (album_url, json.dumps(album_info.to_dict()), time.time())
+            )
+    
+    def get_song_page(self, song_page_url: str, audio_format: str) -> Optional[Tuple[str, List[str]]]:
+        """Song name and download URLs of a page as resolved for audio_format"""
+        with self._lock:
+            rows = {
+                row[0]: (row[1], json.loads(row[2])) for row in self._conn.execute(
+                    'SELECT audio_format, song_name, urls FROM song_pages WHERE song_page_url = ? AND audio_format IN (?, ?)',
+                    (song_page_url, audio_format, 'both')
+                )
+            }
+        if audio_format in rows:
+            return rows[audio_format]
+        if 'both' in rows:
+            # A page resolved for both formats also answers single-format lookups
+            song_name, urls = rows['both']
+            urls = [url for url in urls if f'.{audio_format}' in url.lower()]
+            return (song_name, urls) if urls else None
+        return None
+    
+    def record_song_page(self, album_url: str, song_page_url: str, audio_format: str, song_name: str,
+                         download_urls: List[str]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO song_pages (song_page_url, audio_format, album_url, song_name, urls) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (song_page_url, audio_format, album_url, song_name, json.dumps(download_urls))
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO files (url, album_url) VALUES (?, ?)',
+                [(url, album_url) for url in download_urls]
+            )
+    
+    def get_completed_files(self, album_url: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT url FROM files WHERE album_url = ? AND completed_at IS NOT NULL', (album_url,)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def record_file(self, url: str, filepath: Path, size: int, sha256: str):
+        """Completion listener for FileDownloader; files the journal doesn't track are ignored"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE files SET path = ?, size = ?, sha256 = ?, completed_at = ? WHERE url = ?',
+                (str(filepath), size, sha256, time.time(), url)
+            )
+    
+    def finish_album(self, album_url: str):
+        with self._lock, self._conn:
+            for table in ('files', 'song_pages', 'albums'):
+                self._conn.execute(f'DELETE FROM {table} WHERE album_url = ?', (album_url,))
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
\ No newline at end of file
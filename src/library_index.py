@@ -0,0 +1,123 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Set, Tuple, Optional, Iterable
+from .models import AlbumInfo
+
+class LibraryIndex:
+    """Persistent record of every owned track file and every completed album.
+    
+    Tracks are keyed by (album URL, song page URL, format), so skip decisions
+    don't depend on how album names map to folders. The keys are loaded into
+    memory once when the index is opened, making each lookup a set membership
+    test instead of a filesystem check.
+    """
+    
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS tracks ('
+                'album_url TEXT NOT NULL, song_page_url TEXT NOT NULL, format TEXT NOT NULL, '
+                'path TEXT NOT NULL, size INTEGER NOT NULL, sha256 TEXT, recorded_at REAL NOT NULL, '
+                'PRIMARY KEY (album_url, song_page_url, format))'
+            )
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS albums ('
+                'album_url TEXT PRIMARY KEY, name TEXT NOT NULL, audio_format TEXT NOT NULL, '
+                'files INTEGER NOT NULL, completed_at REAL NOT NULL)'
+            )
+            # Songlist of each album as of its last complete download, for sync diffs
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS snapshots ('
+                'album_url TEXT PRIMARY KEY, data TEXT NOT NULL, taken_at REAL NOT NULL)'
+            )
+        
+        started = time.monotonic()
+        self._tracks: Set[Tuple[str, str, str]] = {
+            tuple(row) for row in self._conn.execute('SELECT album_url, song_page_url, format FROM tracks')
+        }
+        self._albums: Dict[str, Tuple[str, str, int]] = {
+            row[0]: (row[1], row[2], row[3])
+            for row in self._conn.execute('SELECT album_url, name, audio_format, files FROM albums')
+        }
+        print(f"Library index: {len(self._tracks)} files, {len(self._albums)} complete albums "
+              f"({(time.monotonic() - started) * 1000:.0f} ms)")
+    
+    def get_complete_album(self, album_url: str, audio_format: str) -> Optional[Tuple[str, int]]:
+        """Name and file count of an album completed in audio_format (or in both formats)"""
+        album = self._albums.get(album_url)
+        if album and album[1] in (audio_format, 'both'):
+            return album[0], album[2]
+        return None
+    
+    def has_track(self, album_url: str, song_page_url: str, file_format: str) -> bool:
+        return (album_url, song_page_url, file_format) in self._tracks
+    
+    def record_track(self, album_url: str, song_page_url: str, file_format: str,
+                     filepath: Path, size: int, sha256: Optional[str] = None):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO tracks '
+                '(album_url, song_page_url, format, path, size, sha256, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (album_url, song_page_url, file_format, str(Path(filepath).absolute()), size, sha256, time.time())
+            )
+            self._tracks.add((album_url, song_page_url, file_format))
+    
+    def mark_album_complete(self, album_url: str, name: str, audio_format: str, files: int):
+        with self._lock, self._conn:
+            previous = self._albums.get(album_url)
+            if previous and previous[1] == 'both' and audio_format != 'both':
+                return  # Already complete in every format
+            self._conn.execute(
+                'INSERT OR REPLACE INTO albums (album_url, name, audio_format, files, completed_at) VALUES (?, ?, ?, ?, ?)',
+                (album_url, name, audio_format, files, time.time())
+            )
+            self._albums[album_url] = (name, audio_format, files)
+    
+    def forget_files(self, paths: Iterable[Path], album_dirs: Iterable[Path]) -> Set[str]:
+        """Drop the tracks stored at paths, and the complete mark of every album with a track in one
+        of album_dirs (a lost booklet image has no track row), so the next run fetches them again.
+        Returns the URLs of the albums that lost their complete mark."""
+        lost = {str(Path(path).absolute()) for path in paths}
+        dirs = [Path(directory).absolute() for directory in album_dirs]
+        with self._lock, self._conn:
+            rows = self._conn.execute('SELECT album_url, song_page_url, format, path FROM tracks').fetchall()
+            affected = set()
+            for album_url, song_page_url, file_format, path in rows:
+                if path in lost:
+                    self._conn.execute(
+                        'DELETE FROM tracks WHERE album_url = ? AND song_page_url = ? AND format = ?',
+                        (album_url, song_page_url, file_format)
+                    )
+                    self._tracks.discard((album_url, song_page_url, file_format))
+                    affected.add(album_url)
+                elif any(Path(path).is_relative_to(directory) for directory in dirs):
+                    affected.add(album_url)
+            affected &= self._albums.keys()
+            for album_url in affected:
+                self._conn.execute('DELETE FROM albums WHERE album_url = ?', (album_url,))
+                del self._albums[album_url]
+        return affected
+    
+    def get_snapshot(self, album_url: str) -> Optional[AlbumInfo]:
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM snapshots WHERE album_url = ?', (album_url,)).fetchone()
+        return AlbumInfo.from_dict(json.loads(row[0])) if row else None
+    
+    def save_snapshot(self, album_url: str, album_info: AlbumInfo):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO snapshots (album_url, data, taken_at) VALUES (?, ?, ?)',
+                (album_url, json.dumps(album_info.to_dict()), time.time())
+            )
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,135 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Tuple, Optional, Callable
+from .config import Config
+from .models import AlbumInfo
+
+class MetadataCache:
+    """SQLite store of scraped album pages and resolved song pages, keyed by URL.
+    
+    Entries expire after ``ttl`` seconds; once more than ``max_entries`` are
+    stored, the least recently used ones are evicted.
+    """
+    
+    def __init__(self, path: Path, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        with self._conn:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)')
+    
+    def get_album(self, url: str) -> Optional[AlbumInfo]:
+        data = self._get(f'album:{url}')
+        return AlbumInfo.from_dict(data) if data else None
+    
+    def put_album(self, url: str, album_info: AlbumInfo):
+        self._put(f'album:{url}', album_info.to_dict())
+    
+    def get_download_urls(self, song_page_url: str, audio_format: str) -> Optional[Tuple[str, List[str]]]:
+        data = self._get(f'song:{audio_format}:{song_page_url}')
+        if data is None and audio_format != 'both':
+            # A page resolved for both formats also answers single-format lookups
+            data = self._get(f'song:both:{song_page_url}')
+            if data:
+                data['urls'] = [url for url in data['urls'] if f'.{audio_format}' in url.lower()]
+        return (data['song_name'], data['urls']) if data and data['urls'] else None
+    
+    def put_download_urls(self, song_page_url: str, audio_format: str, song_name: str, download_urls: List[str]):
+        self._put(f'song:{audio_format}:{song_page_url}', {'song_name': song_name, 'urls': download_urls})
+    
+    def forget_album(self, url: str):
+        self._delete([f'album:{url}'])
+    
+    def forget_download_urls(self, song_page_url: str):
+        self._delete([f'song:{audio_format}:{song_page_url}' for audio_format in ('mp3', 'flac', 'both')])
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def _delete(self, keys: List[str]):
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM entries WHERE key = ?', [(key,) for key in keys])
+    
+    def _get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT data, created_at FROM entries WHERE key = ?', (key,)).fetchone()
+            if not row:
+                return None
+            data, created_at = row
+            with self._conn:
+                if now - created_at > self.ttl:
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                    return None
+                self._conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(data)
+    
+    def _put(self, key: str, data: dict):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (key, data, created_at, accessed_at) VALUES (?, ?, ?, ?)',
+                (key, json.dumps(data), now, now)
+            )
+            self._evict()
+    
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                'DELETE FROM entries WHERE key IN '
+                '(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)',
+                (count - self.max_entries,)
+            )
+
+class CachedScraper:
+    """Answer scraper calls from a MetadataCache, creating the real scraper only on a miss"""
+    
+    def __init__(self, cache: MetadataCache, scraper_factory: Callable, config: Config):
+        self.cache = cache
+        self.scraper_factory = scraper_factory
+        self.config = config
+        self.scraper = None
+        self._lock = threading.Lock()
+    
+    def get_album_info(self, url: str) -> AlbumInfo:
+        if not self.config.refresh:
+            album_info = self.cache.get_album(url)
+            if album_info:
+                print("Using cached album information")
+                return album_info
+        
+        album_info = self._get_scraper().get_album_info(url)
+        if album_info.tracks:
+            self.cache.put_album(url, album_info)
+        return album_info
+    
+    def get_download_urls(self, song_page_url: str) -> Tuple[str, List[str]]:
+        audio_format = self.config.audio_format
+        if not self.config.refresh:
+            cached = self.cache.get_download_urls(song_page_url, audio_format)
+            if cached:
+                return cached
+        
+        song_name, download_urls = self._get_scraper().get_download_urls(song_page_url)
+        if download_urls:
+            self.cache.put_download_urls(song_page_url, audio_format, song_name, download_urls)
+        return song_name, download_urls
+    
+    def _get_scraper(self):
+        with self._lock:
+            if not self.scraper:
+                self.scraper = self.scraper_factory()
+            return self.scraper
\ No newline at end of file
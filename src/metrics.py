@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import bisect
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import List, Optional, Sequence, Dict, Tuple
+
+# Upper bounds in seconds, suited to page loads and HTTP requests
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+class Histogram:
+    """Per-bucket (not cumulative) counts of observed values, plus count, sum and max"""
+    
+    def __init__(self, name: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = sorted(buckets)
+        # The last slot counts values above the largest bound
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.max = max(self.max, value)
+    
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile (max for the overflow bucket)"""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            seen = 0
+            for bound, count in zip(self.buckets, self.counts):
+                seen += count
+                if seen >= rank:
+                    return min(bound, self.max)
+            return self.max
+    
+    def describe(self) -> str:
+        if not self.count:
+            return f"{self.name}: no observations"
+        return (
+            f"{self.name}: {self.count} observations, mean {self.sum / self.count:.2f}s, "
+            f"p50 <= {self.percentile(0.5):.2f}s, p95 <= {self.percentile(0.95):.2f}s, max {self.max:.2f}s"
+        )
+    
+    def cumulative_counts(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations <= bound) pairs ending with +Inf, as Prometheus expects"""
+        with self._lock:
+            pairs = []
+            seen = 0
+            for bound, count in zip(self.buckets + [float('inf')], self.counts):
+                seen += count
+                pairs.append((bound, seen))
+            return pairs
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class MetricsRegistry:
+    """Counters and histograms, optionally labelled, for the whole process.
+    
+    Observations can also be appended to a JSON-lines log as they happen,
+    and the current values rendered in the Prometheus text format.
+    """
+    
+    def __init__(self):
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._log = None
+        self._lock = threading.Lock()
+    
+    def describe(self, name: str, description: str):
+        self._descriptions[name] = description
+    
+    def inc(self, name: str, amount: float = 1.0, **labels):
+        key = (name, self._label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+    
+    def get(self, name: str, **labels) -> float:
+        """Value of a counter summed over every label set that includes the given labels"""
+        wanted = set(self._label_key(labels))
+        with self._lock:
+            return sum(
+                value for (counter, key), value in self._counters.items()
+                if counter == name and wanted.issubset(key)
+            )
+    
+    def histogram(self, name: str, **labels) -> Histogram:
+        key = (name, self._label_key(labels))
+        with self._lock:
+            if key not in self._histograms:
+                title = self._descriptions.get(name, name)
+                if labels:
+                    title += ' (' + ', '.join(value for _, value in key[1]) + ')'
+                self._histograms[key] = Histogram(title)
+            return self._histograms[key]
+    
+    def observe(self, name: str, value: float, **labels):
+        self.histogram(name, **labels).observe(value)
+        self.log(name, value=round(value, 6), **labels)
+    
+    @contextmanager
+    def timer(self, name: str, **labels):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started, **labels)
+    
+    def histograms(self, name: str) -> List[Histogram]:
+        with self._lock:
+            return [histogram for (histogram_name, _), histogram in self._histograms.items() if histogram_name == name]
+    
+    def open_log(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            # Line buffered so the log can be tailed while a run is going
+            self._log = open(path, 'a', encoding='utf-8', buffering=1)
+    
+    def close_log(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+    
+    def log(self, event: str, **fields):
+        """Append one event to the JSON-lines log, if one is open"""
+        if not self._log:
+            return
+        line = json.dumps({'ts': round(time.time(), 3), 'event': event, **fields})
+        with self._lock:
+            if self._log:
+                self._log.write(line + '\n')
+    
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        
+        described = set()
+        for (name, labels), value in counters:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {self._descriptions.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{self._format_labels(labels)} {self._format_value(value)}")
+        
+        for (name, labels), histogram in histograms:
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {self._descriptions.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in histogram.cumulative_counts():
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f"{name}_bucket{self._format_labels(labels + (('le', le),))} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {self._format_value(histogram.sum)}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+    
+    def write_prometheus(self, path: Path):
+        """Write the text format atomically, e.g. for node_exporter's textfile collector"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+    
+    def reset(self):
+        """Drop every counter and histogram, e.g. between benchmark runs"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+    
+    @staticmethod
+    def _label_key(labels: Dict[str, object]) -> LabelKey:
+        return tuple(sorted((name, str(value)) for name, value in labels.items()))
+    
+    @staticmethod
+    def _format_value(value: float) -> str:
+        # Full precision: :g would round a byte count like 7448576 to 7.44858e+06
+        if float(value).is_integer():
+            return str(int(value))
+        return repr(float(value))
+    
+    @staticmethod
+    def _format_labels(labels: LabelKey) -> str:
+        if not labels:
+            return ''
+        parts = []
+        for name, value in labels:
+            value = value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{name}="{value}"')
+        return '{' + ','.join(parts) + '}'
+
+# Shared by every component of a run, like a logging module's root logger
+registry = MetricsRegistry()
+
+registry.describe('scrape_seconds', 'Time to scrape an album or song page, cache hits included')
+registry.describe('page_ready_seconds', 'Page ready time')
+registry.describe('request_latency_seconds', 'Time until response headers arrived')
+registry.describe('transfer_seconds', 'Time to transfer one file')
+registry.describe('bytes_downloaded_total', 'Bytes received from file hosts')
+registry.describe('sleep_seconds_total', 'Time spent waiting on rate limits and retry backoff')
+registry.describe('retries_total', 'Retried operations by error kind')
+registry.describe('files_queued_total', 'Files handed to the download workers')
+registry.describe('files_completed_total', 'Files downloaded or found already present')
+registry.describe('files_failed_total', 'Files that failed for good')
@@ -1,13 +1,21 @@
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from itertools import islice
+from dataclasses import dataclass, asdict, field
+from typing import List, Dict, Optional, Any, NamedTuple
 
-@dataclass
-class TrackInfo:
+class TrackInfo(NamedTuple):
+    """One songlist row. A tuple, so the thousands of them in a large batch
+    don't each carry an attribute dict."""
     cd_number: int
     track_number: int
     title: str
     song_page_url: str
     duration: str = ""
+    # File sizes in bytes from the album page's MP3/FLAC columns; 0 when not listed
+    mp3_size: int = 0
+    flac_size: int = 0
+    
+    def size_of(self, file_format: str) -> int:
+        return self.flac_size if file_format == 'flac' else self.mp3_size
     
     def get_formatted_filename(self, extension: str) -> str:
         """Generate formatted filename: '01. Song Title.mp3'"""
@@ -23,12 +31,49 @@ class AlbumInfo:
     name: str
     tracks: List[TrackInfo]
     booklet_images: List[BookletImage]
+    # CD grouping, extended with the tracks appended since it was last asked for
+    _cd_tracks: Dict[int, List[TrackInfo]] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _grouped: int = field(default=0, init=False, repr=False, compare=False)
     
     def get_tracks_by_cd(self) -> Dict[int, List[TrackInfo]]:
-        """Group tracks by CD number"""
-        cd_tracks = {}
-        for track in self.tracks:
-            if track.cd_number not in cd_tracks:
-                cd_tracks[track.cd_number] = []
-            cd_tracks[track.cd_number].append(track)
-        return cd_tracks
\ No newline at end of file
+        """Group tracks by CD number (shared, so don't modify the result)"""
+        for track in islice(self.tracks, self._grouped, None):
+            self._cd_tracks.setdefault(track.cd_number, []).append(track)
+        self._grouped = len(self.tracks)
+        return self._cd_tracks
+    
+    @property
+    def cd_count(self) -> int:
+        return len(self.get_tracks_by_cd())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'tracks': [track._asdict() for track in self.tracks],
+            'booklet_images': [asdict(image) for image in self.booklet_images]
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'AlbumInfo':
+        return cls(
+            name=data['name'],
+            tracks=[TrackInfo(**track) for track in data['tracks']],
+            booklet_images=[BookletImage(**image) for image in data['booklet_images']]
+        )
+
+@dataclass
+class AlbumResult:
+    url: str
+    name: str = ""
+    total_tracks: int = 0
+    processed_tracks: int = 0
+    total_files: int = 0
+    successful_files: int = 0
+    total_booklets: int = 0
+    successful_booklets: int = 0
+    failed_items: List[str] = field(default_factory=list)
+    error: str = ""
+    # Skipped because the library index records the album as complete
+    skipped: bool = False
+    # Songlist differences found in sync mode
+    changes: List[str] = field(default_factory=list)
\ No newline at end of file
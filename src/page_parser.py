@@ -0,0 +1,142 @@
+"""Interpretation of scraped KHInsider pages, shared by both scraper backends.
+
+A backend reduces a page to plain data and these functions turn that into
+models. Songlist rows are lists of cells, each a dict with the cell's
+``text`` and the ``link_text`` and absolute ``href`` of its first link
+(None without one). Songlist header cells are dicts with the cell's ``text``
+and its ``colspan``. Every other link is an absolute URL.
+"""
+
+import re
+from typing import List, Dict, Optional, Iterable, Iterator
+from .models import TrackInfo, BookletImage
+
+DOWNLOAD_DOMAINS = ['vgmsite.com', 'eta.vgmtreasurechest.com', 'vgmtreasurechest.com']
+AUDIO_EXTENSIONS = ['.mp3', '.flac', '.ogg', '.wav']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif']
+SIZE_UNITS = {'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+
+def iter_tracks(rows: Iterable[List[Dict[str, Optional[str]]]], header: List[Dict]) -> Iterator[TrackInfo]:
+    """Tracks of a songlist, each yielded as soon as its row is parsed"""
+    header = header_columns(header)
+    has_cd_column = any('CD' in text.upper() for text in header)
+    # Cell index of each format's size column
+    size_columns = {
+        text.strip().lower(): index for index, text in enumerate(header) if text.strip().upper() in ('MP3', 'FLAC')
+    }
+    for cells in rows:
+        if len(cells) < 4:  # Minimum cells needed
+            continue
+        try:
+            if has_cd_column:
+                # Format with CD column: [play] [CD] [#] [Title] [Duration] [MP3] [FLAC] [Download] [Playlist]
+                cd_number = int(cells[1]['text'])
+                track_text = cells[2]['text']
+                title_cell = cells[3]
+                duration_cell = cells[4]
+            else:
+                # Format without CD column: [play] [#] [Title] [Duration] [MP3] [FLAC] [Download] [Playlist]
+                cd_number = 1  # Default to CD1 when no CD column
+                track_text = cells[1]['text']
+                title_cell = cells[2]
+                duration_cell = cells[3]
+            
+            track_number = int(track_text.rstrip('.'))
+            song_url = title_cell['href']
+            
+            if song_url and not song_url.endswith('#'):
+                yield TrackInfo(
+                    cd_number=cd_number,
+                    track_number=track_number,
+                    title=title_cell['link_text'],
+                    song_page_url=song_url,
+                    duration=duration_cell['link_text'] or duration_cell['text'],
+                    mp3_size=_cell_size(cells, size_columns.get('mp3')),
+                    flac_size=_cell_size(cells, size_columns.get('flac'))
+                )
+        except (ValueError, IndexError) as e:
+            print(f"Error parsing track row: {e}")
+            continue
+
+def header_columns(cells: List[Dict]) -> List[str]:
+    """Text of the header cell above each row cell. A header cell can span several
+    columns, "Song Name" over the title and duration for one."""
+    columns = []
+    for cell in cells:
+        try:
+            span = max(1, int(cell.get('colspan') or 1))
+        except ValueError:
+            span = 1
+        columns.extend([cell['text']] * span)
+    return columns
+
+def _cell_size(cells: List[Dict[str, Optional[str]]], index: Optional[int]) -> int:
+    if index is None or index >= len(cells):
+        return 0
+    return parse_size(cells[index]['text'])
+
+def parse_size(text: str) -> int:
+    """Bytes in a size such as '7.33 MB' or '1,024 KB'; 0 if there is none"""
+    match = re.match(r'\s*([\d.,]+)\s*([KMG]?B)\b', text or '', re.IGNORECASE)
+    if not match:
+        return 0
+    try:
+        return int(float(match.group(1).replace(',', '')) * SIZE_UNITS[match.group(2).upper()])
+    except ValueError:
+        return 0
+
+def parse_song_name(paragraphs: List[str]) -> str:
+    for text in paragraphs:
+        if 'Song name:' in text:
+            return text.split('Song name:')[1].strip()
+    return "Unknown Song"
+
+def parse_download_urls(song_download_links: List[Optional[str]], links: List[str], audio_format: str) -> List[str]:
+    """Pick download URLs from the songDownloadLink anchors, else from all links of the page"""
+    # Method 1: the <a> around each songDownloadLink span
+    download_urls = [href for href in song_download_links if href and is_valid_audio_url(href, audio_format)]
+    
+    # Method 2: links to known download hosts with an audio extension
+    if not download_urls:
+        for href in links:
+            is_download_link = any(domain in href for domain in DOWNLOAD_DOMAINS)
+            has_audio_extension = any(ext in href.lower() for ext in AUDIO_EXTENSIONS)
+            if is_download_link and has_audio_extension and is_valid_audio_url(href, audio_format):
+                download_urls.append(href)
+    
+    # Method 3: any absolute link to an audio file
+    if not download_urls:
+        print("No download URLs found with known methods, searching for any audio links...")
+        for href in links:
+            if href.startswith('http') and is_valid_audio_url(href, audio_format):
+                download_urls.append(href)
+    
+    return download_urls
+
+def is_valid_audio_url(url: str, audio_format: str) -> bool:
+    """Check if URL matches the configured audio format"""
+    url_lower = url.lower()
+    
+    if audio_format == 'both':
+        return '.mp3' in url_lower or '.flac' in url_lower
+    elif audio_format == 'mp3':
+        return '.mp3' in url_lower
+    elif audio_format == 'flac':
+        return '.flac' in url_lower
+    
+    return False
+
+def parse_booklet_images(album_images: List[Dict[str, Optional[str]]], table_links: List[str]) -> List[BookletImage]:
+    """Booklet images from the .albumImage blocks (link and thumbnail), else from image links in tables"""
+    booklet_images = [
+        BookletImage(url=image['href'], filename=image['href'].split('/')[-1])
+        for image in album_images
+        if image['href'] and image['src']
+    ]
+    
+    if not booklet_images:
+        for href in table_links:
+            if any(ext in href.lower() for ext in IMAGE_EXTENSIONS):
+                booklet_images.append(BookletImage(url=href, filename=href.split('/')[-1]))
+    
+    return booklet_images
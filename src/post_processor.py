@@ -0,0 +1,140 @@
+"""Tagging and transcoding of downloaded tracks.
+
+The work runs in a process pool, so it uses every core while the download
+threads keep transferring. Tags are written with mutagen and MP3s are encoded
+with ffmpeg; both are optional and the stage turns itself off without them.
+"""
+
+import os
+import shutil
+import subprocess
+import importlib.util
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Optional, Tuple
+from .config import Config
+from .models import TrackInfo
+from .content_index import ContentIndex
+
+def build_tags(album_name: str, track: TrackInfo, cd_size: int, total_cds: int) -> Dict[str, str]:
+    """Tags from the scraped metadata, under mutagen's format-independent "easy" keys"""
+    tags = {
+        'album': album_name,
+        'title': track.title,
+        'tracknumber': f"{track.track_number}/{cd_size}",
+        'discnumber': f"{track.cd_number}/{total_cds}",
+    }
+    length = parse_duration(track.duration)
+    if length is not None:
+        tags['length'] = str(length * 1000)
+    return tags
+
+def parse_duration(duration: str) -> Optional[int]:
+    """Seconds in a songlist duration such as '3:07' or '1:02:33'"""
+    try:
+        seconds = 0
+        for part in duration.split(':'):
+            seconds = seconds * 60 + int(part)
+        return seconds
+    except ValueError:
+        return None
+
+def process_track(path: str, tags: Optional[Dict[str, str]], mp3_path: Optional[str],
+                  bitrate: str) -> Dict[str, Tuple[str, int, str]]:
+    """Tag path and/or derive an MP3 from it. Runs in a worker process; returns
+    (path, size, sha256) of each file written, under 'tagged' and 'transcoded'."""
+    written = {}
+    if tags:
+        break_hardlink(path)
+        write_tags(path, tags)
+        written['tagged'] = path
+    if mp3_path:
+        transcode_to_mp3(path, mp3_path, bitrate)
+        if tags:
+            write_tags(mp3_path, tags)
+        written['transcoded'] = mp3_path
+    return {
+        kind: (filepath, os.path.getsize(filepath), ContentIndex.hash_file(Path(filepath)))
+        for kind, filepath in written.items()
+    }
+
+def break_hardlink(path: str):
+    """Give path its own copy of the data, so tagging it leaves deduplicated twins alone"""
+    if os.stat(path).st_nlink <= 1:
+        return
+    temp_path = path + '.unlink'
+    shutil.copy2(path, temp_path)
+    os.replace(temp_path, path)
+
+def write_tags(path: str, tags: Dict[str, str]):
+    import mutagen
+    from mutagen.easyid3 import EasyID3
+    
+    audio = mutagen.File(path, easy=True)
+    if audio is None:
+        raise ValueError(f"unrecognised audio file {os.path.basename(path)}")
+    if audio.tags is None:
+        audio.add_tags()
+    for key, value in tags.items():
+        # FLAC stores its length in the stream header, ID3 needs a TLEN frame
+        if key == 'length' and not isinstance(audio.tags, EasyID3):
+            continue
+        audio[key] = value
+    audio.save()
+
+def transcode_to_mp3(source: str, target: str, bitrate: str):
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = target + '.part'
+    command = [
+        'ffmpeg', '-nostdin', '-loglevel', 'error', '-y', '-i', source,
+        '-map', '0:a', '-codec:a', 'libmp3lame', '-b:a', bitrate, '-f', 'mp3', temp_path
+    ]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise RuntimeError(f"ffmpeg failed: {completed.stderr.strip()}")
+    os.replace(temp_path, target)
+
+class PostProcessor:
+    """Process pool that tags and transcodes tracks as their downloads complete"""
+    
+    def __init__(self, config: Config):
+        self.config = config
+        self.tag = config.tag_files and self._check_mutagen()
+        self.transcode = config.transcode_mp3 and self._check_ffmpeg()
+        self.executor = None
+        if self.tag or self.transcode:
+            # Spawned, not forked: forking a process full of download threads can deadlock
+            self.executor = ProcessPoolExecutor(
+                max_workers=config.post_workers or None,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+    
+    @property
+    def enabled(self) -> bool:
+        return self.executor is not None
+    
+    def submit(self, filepath: Path, tags: Optional[Dict[str, str]], mp3_path: Optional[Path] = None) -> Future:
+        return self.executor.submit(
+            process_track, str(filepath), tags, str(mp3_path) if mp3_path else None, self.config.mp3_bitrate
+        )
+    
+    def close(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+    
+    def _check_mutagen(self) -> bool:
+        # Imported by the workers only, so the main process doesn't load it for nothing
+        if importlib.util.find_spec('mutagen'):
+            return True
+        print("Warning: mutagen is not installed, tracks will not be tagged")
+        return False
+    
+    def _check_ffmpeg(self) -> bool:
+        if shutil.which('ffmpeg'):
+            return True
+        print("Warning: ffmpeg was not found on the PATH, no MP3s will be derived from FLAC")
+        return False
@@ -0,0 +1,134 @@
+import sys
+import time
+import threading
+from pathlib import Path
+from typing import Optional
+from .metrics import MetricsRegistry
+
+class ProgressReporter:
+    """Background thread that redraws an aggregate progress bar on stderr and
+    refreshes the Prometheus metrics file while a run is going.
+    
+    The bar is only drawn when stderr is a terminal, so redirected output
+    stays free of carriage returns. When stdout goes to the same terminal,
+    it is routed through write_through while the bar is up, so printed
+    lines take the bar's place and the bar is drawn again below them.
+    """
+    
+    BAR_WIDTH = 30
+    
+    def __init__(self, registry: MetricsRegistry, interval: float = 1.0,
+                 show_bar: bool = True, metrics_file: Optional[Path] = None):
+        self.registry = registry
+        self.interval = interval
+        self.show_bar = show_bar and sys.stderr.isatty()
+        self.metrics_file = metrics_file
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_bytes = 0.0
+        self._last_time = 0.0
+        self._lock = threading.RLock()
+        # Last bar drawn, whether it is on screen, and whether stdout is part way through a line
+        self._line = ''
+        self._bar_shown = False
+        self._line_open = False
+        self._stdout = None
+    
+    def start(self):
+        if not (self.show_bar or self.metrics_file):
+            return
+        self._stop.clear()
+        self._last_bytes = self.registry.get('bytes_downloaded_total')
+        self._last_time = time.monotonic()
+        if self.show_bar and sys.stdout.isatty():
+            self._stdout = sys.stdout
+            sys.stdout = BarAwareStream(self._stdout, self)
+        self._thread = threading.Thread(target=self._run, name="progress", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        if not self._thread:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._refresh()
+        if self._stdout:
+            sys.stdout = self._stdout
+            self._stdout = None
+        if self.show_bar:
+            sys.stderr.write('\n')
+            sys.stderr.flush()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._refresh()
+    
+    def _refresh(self):
+        if self.metrics_file:
+            try:
+                self.registry.write_prometheus(self.metrics_file)
+            except OSError as e:
+                print(f"Warning: could not write metrics file: {e}")
+        if self.show_bar:
+            line = self.render()
+            with self._lock:
+                self._line = line
+                # Drawn once the line being printed is complete, so it isn't overwritten
+                if not self._line_open:
+                    self._draw()
+    
+    def write_through(self, stream, text: str) -> int:
+        """Write text to stream, stdout on the bar's terminal, without mixing the two"""
+        if not text:
+            return 0
+        with self._lock:
+            if self._bar_shown:
+                sys.stderr.write('\r' + ' ' * len(self._line) + '\r')
+                sys.stderr.flush()
+                self._bar_shown = False
+            written = stream.write(text)
+            stream.flush()
+            self._line_open = not text.endswith('\n')
+            if self._line and not self._line_open:
+                self._draw()
+        return written
+    
+    def _draw(self):
+        sys.stderr.write('\r' + self._line)
+        sys.stderr.flush()
+        self._bar_shown = True
+    
+    def render(self) -> str:
+        queued = int(self.registry.get('files_queued_total'))
+        completed = int(self.registry.get('files_completed_total'))
+        failed = int(self.registry.get('files_failed_total'))
+        downloaded = self.registry.get('bytes_downloaded_total')
+        
+        now = time.monotonic()
+        elapsed = now - self._last_time
+        speed = (downloaded - self._last_bytes) / elapsed if elapsed > 0 else 0.0
+        self._last_bytes, self._last_time = downloaded, now
+        
+        done = completed + failed
+        filled = int(self.BAR_WIDTH * done / queued) if queued else 0
+        bar = '#' * filled + '-' * (self.BAR_WIDTH - filled)
+        line = (f"[{bar}] {done}/{queued} files, {downloaded / (1024 * 1024):.1f} MB, "
+                f"{speed / (1024 * 1024):.2f} MB/s")
+        if failed:
+            line += f", {failed} failed"
+        # Padding wipes what is left of a longer previous line
+        return line.ljust(79)
+
+class BarAwareStream:
+    """Stands in for sys.stdout while a progress bar is drawn on the same terminal"""
+    
+    def __init__(self, stream, reporter: ProgressReporter):
+        self._stream = stream
+        self._reporter = reporter
+    
+    def write(self, text: str) -> int:
+        return self._reporter.write_through(self._stream, text)
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
@@ -0,0 +1,170 @@
+import time
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from typing import Dict, Optional
+from .metrics import registry
+
+class HostState:
+    __slots__ = ('rate', 'tokens', 'updated_at', 'blocked_until')
+    
+    def __init__(self, rate: float, now: float):
+        self.rate = rate
+        self.tokens = 1.0
+        self.updated_at = now
+        self.blocked_until = 0.0
+
+class AdaptiveRateLimiter:
+    """Per-host token bucket whose rate adapts to how the server responds (AIMD).
+    
+    Every fast 2xx response adds ``increase`` requests/s to the host's rate, up
+    to ``max_rate``. 429/503 responses halve it and slow responses cut it by a
+    quarter, down to ``min_rate``. A ``Retry-After`` header pauses the host
+    entirely until it expires. With ``adaptive=False`` the rate stays at
+    ``initial_rate``, which spaces requests like a fixed delay would.
+    """
+    
+    def __init__(self, initial_rate: float, min_rate: float, max_rate: float,
+                 slow_response: float = 5.0, increase: float = 0.1, adaptive: bool = True, name: str = ""):
+        self.initial_rate = initial_rate
+        self.min_rate = min(min_rate, initial_rate)
+        self.max_rate = max(max_rate, initial_rate)
+        self.slow_response = slow_response
+        self.increase = increase
+        self.adaptive = adaptive
+        self.name = name
+        self._hosts: Dict[str, HostState] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_delay(cls, delay: float, config, name: str = "") -> 'AdaptiveRateLimiter':
+        """Start from the rate implied by a fixed delay between requests"""
+        initial_rate = 1.0 / delay if delay > 0 else config.max_request_rate
+        return cls(
+            initial_rate=initial_rate,
+            min_rate=config.min_request_rate,
+            max_rate=config.max_request_rate,
+            slow_response=config.slow_response,
+            adaptive=config.adaptive_rate,
+            name=name
+        )
+    
+    def _get_state(self, host: str, now: float) -> HostState:
+        if host not in self._hosts:
+            self._hosts[host] = HostState(self.initial_rate, now)
+        return self._hosts[host]
+    
+    def reserve(self, url: str) -> float:
+        """Take a token for the host of url, returning how long to wait before using it"""
+        now = time.monotonic()
+        with self._lock:
+            state = self._get_state(urlparse(url).netloc, now)
+            capacity = max(1.0, state.rate)
+            state.tokens = min(capacity, state.tokens + (now - state.updated_at) * state.rate)
+            state.updated_at = now
+            state.tokens -= 1.0
+            wait = -state.tokens / state.rate if state.tokens < 0 else 0.0
+            return max(wait, state.blocked_until - now)
+    
+    def acquire(self, url: str) -> float:
+        wait = self.reserve(url)
+        if wait > 0:
+            self._record_wait(url, wait)
+            time.sleep(wait)
+        return wait
+    
+    async def acquire_async(self, url: str) -> float:
+        wait = self.reserve(url)
+        if wait > 0:
+            self._record_wait(url, wait)
+            await asyncio.sleep(wait)
+        return wait
+    
+    def _record_wait(self, url: str, wait: float):
+        host = urlparse(url).netloc
+        registry.inc('sleep_seconds_total', wait, reason='rate-limit', limiter=self.name, host=host)
+        registry.log('sleep', reason='rate-limit', limiter=self.name, host=host, seconds=round(wait, 3))
+    
+    def feedback(self, url: str, status_code: int, elapsed: float, retry_after: Optional[str] = None):
+        """Adjust the host's rate after a response (elapsed = seconds until headers arrived)"""
+        now = time.monotonic()
+        host = urlparse(url).netloc
+        with self._lock:
+            state = self._get_state(host, now)
+            previous_rate = state.rate
+            
+            if status_code in (429, 503):
+                delay = self.parse_retry_after(retry_after)
+                if delay:
+                    state.blocked_until = max(state.blocked_until, now + delay)
+                if self.adaptive:
+                    state.rate = max(self.min_rate, state.rate / 2)
+            elif not self.adaptive:
+                return
+            elif elapsed > self.slow_response:
+                state.rate = max(self.min_rate, state.rate * 0.75)
+            elif 200 <= status_code < 300:
+                state.rate = min(self.max_rate, state.rate + self.increase)
+            
+            backed_off = state.rate < previous_rate
+        
+        if backed_off:
+            print(f"Slowing down {host} to {state.rate:.2f} requests/s (HTTP {status_code}, {elapsed:.1f}s)")
+    
+    def get_rates(self) -> Dict[str, float]:
+        with self._lock:
+            return {host: state.rate for host, state in self._hosts.items()}
+    
+    def describe(self) -> str:
+        rates = ', '.join(f"{host} {rate:.2f}/s" for host, rate in sorted(self.get_rates().items()))
+        return f"{self.name} request rates: {rates}" if self.name else f"Request rates: {rates}"
+    
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Retry-After is either a number of seconds or an HTTP date"""
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class BandwidthLimiter:
+    """Token bucket in bytes shared by every transfer, capping total throughput.
+    
+    Transfers take tokens for each chunk they receive; the bucket goes into
+    debt instead of refusing, and whoever took the chunk sleeps the debt off,
+    so the average rate holds at ``bytes_per_second`` however many transfers
+    run. Up to one second worth of unused bandwidth can be saved as a burst.
+    """
+    
+    def __init__(self, bytes_per_second: float):
+        self.rate = bytes_per_second
+        self.capacity = bytes_per_second
+        self.tokens = 0.0
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, amount: int) -> float:
+        now = time.monotonic()
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            self.tokens -= amount
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+    
+    def consume(self, amount: int):
+        wait = self.reserve(amount)
+        if wait > 0:
+            registry.inc('sleep_seconds_total', wait, reason='bandwidth')
+            time.sleep(wait)
+    
+    async def consume_async(self, amount: int):
+        wait = self.reserve(amount)
+        if wait > 0:
+            registry.inc('sleep_seconds_total', wait, reason='bandwidth')
+            await asyncio.sleep(wait)
@@ -0,0 +1,154 @@
+import time
+import random
+import asyncio
+import threading
+import requests
+from typing import Optional, Dict, Callable
+from .config import Config
+from .metrics import registry
+
+CONNECTION = "connection"
+TIMEOUT = "timeout"
+RATE_LIMITED = "rate-limited"
+SERVER_ERROR = "server-error"
+NOT_FOUND = "not-found"
+CLIENT_ERROR = "client-error"
+INCOMPLETE = "incomplete"
+PARSE = "parse"
+STOPPED = "stopped"
+UNKNOWN = "unknown"
+
+# How many times each kind of error is retried; kinds that can't improve on retry get none
+MAX_RETRIES_BY_KIND: Dict[str, Optional[int]] = {
+    CONNECTION: None,
+    TIMEOUT: None,
+    RATE_LIMITED: None,
+    SERVER_ERROR: None,
+    INCOMPLETE: None,
+    PARSE: 1,
+    STOPPED: 0,
+    UNKNOWN: 1,
+    NOT_FOUND: 0,
+    CLIENT_ERROR: 0,
+}
+
+class ParseError(Exception):
+    """A page loaded but the expected content could not be extracted from it"""
+
+class RunStopped(Exception):
+    """The run is stopping, so the operation was abandoned part way"""
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+def classify_error(error: BaseException) -> str:
+    """Map an exception from requests, httpx, Selenium or our own code to an error kind"""
+    status_code = get_status_code(error)
+    if status_code is not None:
+        if status_code == 404 or status_code == 410:
+            return NOT_FOUND
+        if status_code == 429:
+            return RATE_LIMITED
+        if status_code >= 500:
+            return SERVER_ERROR
+        if status_code >= 400:
+            return CLIENT_ERROR
+    
+    if isinstance(error, ParseError):
+        return PARSE
+    if isinstance(error, RunStopped):
+        return STOPPED
+    # IncompleteDownloadError and other short reads
+    if type(error).__name__.startswith('Incomplete') or isinstance(error, EOFError):
+        return INCOMPLETE
+    
+    name = type(error).__name__
+    if isinstance(error, (requests.Timeout, TimeoutError)) or 'Timeout' in name:
+        return TIMEOUT
+    if isinstance(error, (requests.ConnectionError, ConnectionError)) or any(
+            marker in name for marker in ('Connect', 'Network', 'Protocol', 'RemoteProtocol', 'ReadError')):
+        return CONNECTION
+    return UNKNOWN
+
+class RetryError(Exception):
+    """Raised once an operation has failed for good; ``kind`` tells why"""
+    
+    def __init__(self, description: str, error: BaseException, kind: str, attempts: int):
+        super().__init__(f"{description}: {kind} after {attempts} attempt(s): {error}")
+        self.error = error
+        self.kind = kind
+        self.attempts = attempts
+
+class RetryPolicy:
+    """Retry transient failures with exponential backoff and full jitter.
+    
+    Each operation gets at most ``max_retries`` retries (fewer for error kinds
+    listed in MAX_RETRIES_BY_KIND), and all operations share a run-wide budget
+    of ``retry_budget`` retries so a dead host can't stall a batch forever.
+    """
+    
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float, retry_budget: int):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_budget = retry_budget
+        self.retries_used = 0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_config(cls, config: Config) -> 'RetryPolicy':
+        return cls(config.max_retries, config.retry_base_delay, config.retry_max_delay, config.retry_budget)
+    
+    def reset(self):
+        """Give the next run a full budget"""
+        with self._lock:
+            self.retries_used = 0
+    
+    def call(self, func: Callable, *args, description: str = "", **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                delay = self._next_delay(e, attempt, description)
+            time.sleep(delay)
+    
+    async def call_async(self, func: Callable, *args, description: str = "", **kwargs):
+        attempt = 0
+        while True:
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                attempt += 1
+                delay = self._next_delay(e, attempt, description)
+            await asyncio.sleep(delay)
+    
+    def _next_delay(self, error: Exception, attempt: int, description: str) -> float:
+        """Backoff before the next attempt, or raise RetryError if there shouldn't be one"""
+        kind = classify_error(error)
+        kind_limit = MAX_RETRIES_BY_KIND.get(kind)
+        max_retries = self.max_retries if kind_limit is None else min(kind_limit, self.max_retries)
+        
+        if attempt > max_retries or not self._take_budget():
+            raise RetryError(description, error, kind, attempt) from error
+        
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.strip().isdigit():
+            delay = max(delay, min(self.max_delay, float(retry_after)))
+        
+        print(f"Retrying {description} in {delay:.1f}s ({kind}, attempt {attempt + 1}/{max_retries + 1}): {error}")
+        registry.inc('retries_total', kind=kind)
+        registry.inc('sleep_seconds_total', delay, reason='retry')
+        registry.log('retry', description=description, kind=kind, attempt=attempt, delay=round(delay, 3), error=str(error))
+        return delay
+    
+    def _take_budget(self) -> bool:
+        with self._lock:
+            if self.retries_used >= self.retry_budget:
+                return False
+            self.retries_used += 1
+            return True
\ No newline at end of file
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from typing import Dict, Deque, Callable, Hashable
+
+class AlbumQueue:
+    __slots__ = ('priority', 'order', 'waiting', 'running')
+    
+    def __init__(self, priority: int, order: int):
+        self.priority = priority
+        self.order = order
+        self.waiting: Deque = deque()
+        self.running = 0
+
+class FairShare:
+    """Which album goes next when a worker frees up.
+    
+    The album with the fewest transfers running wins, so every active album
+    gets an equal share of the workers however many files it queued. Ties go
+    to the lower priority value, then to the album that started first.
+    """
+    
+    def __init__(self):
+        self.albums: Dict[Hashable, AlbumQueue] = {}
+        self._order = itertools.count()
+    
+    def add(self, album: Hashable, priority: int, item):
+        if album not in self.albums:
+            self.albums[album] = AlbumQueue(priority, next(self._order))
+        self.albums[album].waiting.append(item)
+    
+    def pop(self):
+        """Next (album, item), or None when nothing is waiting"""
+        candidates = [(queue.running, queue.priority, queue.order, album)
+                      for album, queue in self.albums.items() if queue.waiting]
+        if not candidates:
+            return None
+        album = min(candidates, key=lambda candidate: candidate[:3])[3]
+        queue = self.albums[album]
+        queue.running += 1
+        return album, queue.waiting.popleft()
+    
+    def done(self, album: Hashable):
+        queue = self.albums[album]
+        queue.running -= 1
+        self._drop_if_idle(album)
+    
+    def clear(self) -> list:
+        """Take every waiting item out, leaving only the running ones"""
+        items = []
+        for album in list(self.albums):
+            items.extend(self.albums[album].waiting)
+            self.albums[album].waiting.clear()
+            self._drop_if_idle(album)
+        return items
+    
+    def discard(self, album: Hashable, item):
+        queue = self.albums.get(album)
+        if queue and item in queue.waiting:
+            queue.waiting.remove(item)
+            self._drop_if_idle(album)
+    
+    def _drop_if_idle(self, album: Hashable):
+        queue = self.albums[album]
+        if not queue.running and not queue.waiting:
+            del self.albums[album]
+
+class FairScheduler:
+    """Worker pool like ThreadPoolExecutor, but shared fairly between albums
+    instead of in submission order, so one huge album can't hold every worker
+    while smaller ones wait behind it.
+    """
+    
+    def __init__(self, workers: int):
+        self._share = FairShare()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f"download-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self._threads:
+            thread.start()
+    
+    def submit(self, album: Hashable, priority: int, fn: Callable, *args) -> Future:
+        future = Future()
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot submit after shutdown")
+            self._share.add(album, priority, (future, fn, args))
+            self._condition.notify()
+        return future
+    
+    def shutdown(self, wait: bool = True, cancel: bool = False):
+        """Stop the workers once the queue has drained. With cancel, queued items are
+        dropped instead, their futures cancelled, and only the running ones finish."""
+        with self._condition:
+            self._shutdown = True
+            dropped = self._share.clear() if cancel else []
+            self._condition.notify_all()
+        for future, _, _ in dropped:
+            future.cancel()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+    
+    def _work(self):
+        while True:
+            with self._condition:
+                picked = self._share.pop()
+                while picked is None:
+                    if self._shutdown:
+                        return
+                    self._condition.wait()
+                    picked = self._share.pop()
+            
+            album, (future, fn, args) = picked
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args))
+                    except BaseException as e:
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._share.done(album)
+
+class AsyncFairSlots:
+    """Semaphore for the async engine that hands free slots to albums fairly"""
+    
+    def __init__(self, size: int):
+        self._free = max(1, size)
+        self._share = FairShare()
+    
+    @asynccontextmanager
+    async def slot(self, album: Hashable, priority: int = 0):
+        waiter = asyncio.get_running_loop().create_future()
+        self._share.add(album, priority, waiter)
+        self._grant()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._share.discard(album, waiter)
+            else:
+                # Granted just before the cancellation: hand the slot back
+                self._release(album)
+            raise
+        try:
+            yield
+        finally:
+            self._release(album)
+    
+    def _grant(self):
+        while self._free:
+            picked = self._share.pop()
+            if picked is None:
+                return
+            album, waiter = picked
+            if waiter.done():
+                # Cancelled while waiting
+                self._share.done(album)
+                continue
+            self._free -= 1
+            waiter.set_result(None)
+    
+    def _release(self, album: Hashable):
+        self._share.done(album)
+        self._free += 1
+        self._grant()